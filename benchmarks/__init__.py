@@ -0,0 +1,13 @@
+# benchmarks/__init__.py
+"""
+Benchmarks for the ingest, lookup and map-query paths, on synthetic data.
+
+    python -m benchmarks.run --files 2000 --transactions 10 --parcels 50000
+    python -m benchmarks.run --save-baseline        # record this machine's baseline
+    python -m benchmarks.run --threshold 0.2        # exit 1 on a >20% regression
+
+synthetic.py writes the inputs (evidence YAMLs, master and suppression
+CSVs, a projected CSV and a bundle zip) into a scratch directory laid out
+like the repo root; run.py times each stage there and compares the results
+with the stored baseline for the same scale in benchmarks/baselines/.
+"""
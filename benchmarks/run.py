@@ -0,0 +1,247 @@
+# benchmarks/run.py
+"""
+Time each ingest/lookup/map stage on a synthetic dataset and compare the
+results with a stored baseline.
+
+Every stage runs --repeat times and its fastest run counts. Results are
+written as JSON (--out); a stage regresses when it is more than
+--threshold slower than the baseline for the same scale (and by more than
+MIN_DELTA seconds, so sub-millisecond noise doesn't fail a run). The exit
+status is 1 if any stage regressed.
+
+    python -m benchmarks.run --files 2000 --transactions 10 --parcels 50000
+    python -m benchmarks.run --save-baseline
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+if os.path.join(ROOT, "scripts") not in sys.path:
+    sys.path.insert(0, os.path.join(ROOT, "scripts"))
+# ─────────────────────────────────────────────────────────────────────────────────
+
+import numpy as np
+
+from benchmarks import synthetic
+
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA = 0.005  # seconds
+
+LOOKUP_BATCH = 10_000
+LOOKUP_SINGLE = 200
+
+# viewports the map viewer query is timed on: (name, bbox, zoom)
+MAP_VIEWS = [
+    ("state", None, 7),  # None → HAWAII_BOUNDS
+    ("island", (21.2, -158.3, 21.8, -157.6), 10),
+    ("street", (21.30, -157.86, 21.31, -157.85), 16),
+]
+
+
+def timed(fn, repeat, setup=None):
+    """(fastest seconds, all runs, fn's last result) over `repeat` calls."""
+    runs, result = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - t0)
+    return min(runs), runs, result
+
+
+def run_stages(args, sample_tmks):
+    """Yield (stage, seconds, runs, info) for each stage, in pipeline order."""
+    import master_coords
+    import rebuild_db_from_yaml
+    from database_builder import build_database_from_zip
+    from reprojection import reproject_csv
+    from suppression_store import get_store
+    from tmk_lookup import bulk_lookup
+    from db_access import DB_PATH, read_connection, query_df
+    from map_data import HAWAII_BOUNDS, viewport_data
+    from tmk_parser import tmk_key
+
+    def quiet(fn):
+        def call():
+            with open(os.devnull, "w") as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    return fn()
+                finally:
+                    sys.stdout = stdout
+        return call
+
+    sidecar = master_coords.sidecar_dir(synthetic.MASTER_CSV)
+    t, runs, coords = timed(
+        lambda: master_coords.load_master_coords([synthetic.MASTER_CSV]), args.repeat,
+        setup=lambda: shutil.rmtree(sidecar, ignore_errors=True),
+    )
+    yield "load_master_coords (parse CSV)", t, runs, {"rows": len(coords)}
+    t, runs, _ = timed(lambda: master_coords.load_master_coords([synthetic.MASTER_CSV]), args.repeat)
+    yield "load_master_coords (sidecar)", t, runs, {"rows": len(coords)}
+
+    t, runs, inserted = timed(
+        quiet(lambda: rebuild_db_from_yaml.build_db(workers=args.workers)), args.repeat
+    )
+    yield "build_db (full)", t, runs, {"transactions": inserted}
+    t, runs, _ = timed(
+        quiet(lambda: rebuild_db_from_yaml.build_db(incremental=True, workers=args.workers)),
+        args.repeat,
+    )
+    yield "build_db (incremental, no changes)", t, runs, {}
+
+    bundle_db = os.path.join("data", "bundle.db")
+    t, runs, _ = timed(
+        quiet(lambda: build_database_from_zip(synthetic.BUNDLE_ZIP, bundle_db, workers=args.workers)),
+        args.repeat,
+    )
+    yield "build_database_from_zip", t, runs, {}
+
+    out = os.path.join("data", "projected_wgs84.csv")
+    t, runs, rows = timed(
+        lambda: reproject_csv(synthetic.PROJECTED_CSV, out, workers=args.workers), args.repeat
+    )
+    yield "reprojection", t, runs, {"rows": rows}
+
+    single = sample_tmks[:LOOKUP_SINGLE]
+
+    def lookup_single():
+        # what tmk_checker's single mode runs per TMK
+        store = get_store()
+        for tmk in single:
+            store.lookup(tmk)
+            query_df(
+                "SELECT latitude, longitude FROM parcels "
+                "WHERE tmk_key = ? AND latitude IS NOT NULL LIMIT 1",
+                (tmk_key(tmk),),
+            )
+
+    get_store()  # index build is a one-off, not part of the lookup
+    t, runs, _ = timed(lookup_single, args.repeat)
+    yield "tmk_checker lookup (single)", t / len(single), [r / len(single) for r in runs], {
+        "per": "lookup", "lookups": len(single),
+    }
+
+    t, runs, result = timed(lambda: bulk_lookup(sample_tmks), args.repeat)
+    yield "tmk_checker lookup (batch)", t, runs, {"tmks": len(result)}
+
+    for name, bbox, zoom in MAP_VIEWS:
+        def query(bbox=bbox or HAWAII_BOUNDS, zoom=zoom):
+            with read_connection(DB_PATH) as conn:
+                return viewport_data(conn, bbox, zoom)
+        t, runs, (count, tier, data) = timed(query, args.repeat)
+        yield f"map_viewer query ({name})", t, runs, {"count": count, "tier": tier, "rows": len(data)}
+
+
+def compare(results, baseline, threshold):
+    """Stages that regressed: [(stage, seconds, baseline seconds)]."""
+    regressions = []
+    for stage, r in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            continue
+        if r["seconds"] > base["seconds"] * (1 + threshold) and r["seconds"] - base["seconds"] > MIN_DELTA:
+            regressions.append((stage, r["seconds"], base["seconds"]))
+    return regressions
+
+
+def scale_name(args):
+    return f"f{args.files}-t{args.transactions}-p{args.parcels}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, lookup and map queries.")
+    parser.add_argument("--files", type=int, default=1000, help="evidence YAMLs to generate")
+    parser.add_argument("--transactions", type=int, default=10, help="transactions per YAML")
+    parser.add_argument("--parcels", type=int, default=20_000, help="parcels in the master CSV")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (fastest counts)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parser/reprojection processes (default: one per CPU)")
+    parser.add_argument("--workdir", default=None,
+                        help="where to generate the data (default: a temp dir, removed afterwards)")
+    parser.add_argument("--out", default=None, help="write the results JSON here")
+    parser.add_argument("--baseline", default=None,
+                        help="baseline JSON (default: benchmarks/baselines/<scale>.json)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown vs. the baseline, as a fraction")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the baseline for this scale")
+    args = parser.parse_args()
+    if min(args.files, args.transactions, args.parcels, args.repeat) < 1:
+        raise ValueError("--files, --transactions, --parcels and --repeat must be at least 1")
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, scale_name(args) + ".json")
+    out_path = os.path.abspath(args.out) if args.out else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="hawaii_bench_"))
+
+    t0 = time.perf_counter()
+    scale = synthetic.generate(workdir, args.files, args.transactions, args.parcels, args.seed)
+    print(f"ℹ️ Generated {scale['files']} YAMLs × {scale['transactions']} transactions, "
+          f"{scale['parcels']} parcels in {time.perf_counter() - t0:.1f}s → {workdir}")
+
+    rng = np.random.default_rng(args.seed + 1)
+    parcels = synthetic.parcel_ids(np.random.default_rng(args.seed), args.parcels)
+    sample = [parcels[i] for i in rng.integers(len(parcels), size=LOOKUP_BATCH)]
+
+    results = {
+        "scale": scale,
+        "repeat": args.repeat,
+        "workers": args.workers,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": {},
+    }
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for stage, seconds, runs, info in run_stages(args, sample):
+            results["stages"][stage] = {"seconds": seconds, "runs": runs, **info}
+            print(f"{stage:<40} {seconds * 1000:>10.1f} ms")
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if out_path:
+        with open(out_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Wrote results → {out_path}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Saved baseline → {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"ℹ️ No baseline at {baseline_path}; run with --save-baseline to record one.")
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for stage, seconds, base in regressions:
+        print(f"❌ {stage}: {seconds * 1000:.1f} ms vs. baseline {base * 1000:.1f} ms "
+              f"(+{(seconds / base - 1) * 100:.0f}%)")
+    if regressions:
+        return 1
+    print(f"✅ No stage more than {args.threshold:.0%} slower than {baseline_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# benchmarks/synthetic.py
+"""
+Synthetic inputs at a configurable scale, laid out like the repo root:
+
+    evidence/bench_000000.yaml ...    N YAMLs × M transactions
+    data/Hawaii_tmk_master.csv        parcel_id, latitude, longitude
+    data/Hawaii_tmk_suppression_status.csv
+    data/projected.csv                the master coords in DEFAULT_SRC_CRS
+    bundle.zip                        yamls/ + csvs/ for build_database_from_zip
+
+Everything is drawn from one seeded RNG, so a given scale always produces
+the same files.
+"""
+import os
+import csv
+import zipfile
+import numpy as np
+import yaml
+
+from map_data import HAWAII_BOUNDS
+from reprojection import DEFAULT_DST_CRS, DEFAULT_SRC_CRS, get_transformer
+
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+MASTER_CSV = os.path.join("data", "Hawaii_tmk_master.csv")
+SUPPRESSION_CSV = os.path.join("data", "Hawaii_tmk_suppression_status.csv")
+PROJECTED_CSV = os.path.join("data", "projected.csv")
+BUNDLE_ZIP = "bundle.zip"
+
+# share of parcels in the master CSV / suppression CSV, and of transactions
+# that carry inline GPS or a formatted (not 9-digit) TMK
+MASTER_SHARE = 0.9
+SUPPRESSION_SHARE = 0.5
+INLINE_GPS_SHARE = 0.1
+FORMATTED_TMK_SHARE = 0.2
+# share of evidence files that are byte-identical copies of another
+DUPLICATE_SHARE = 0.05
+
+NAMES = 500
+
+
+def parcel_ids(rng, count):
+    """`count` distinct 9-digit TMKs: island, zone, section, plat, parcel."""
+    keys = set()
+    while len(keys) < count:
+        n = count - len(keys)
+        island = rng.integers(1, 5, n)
+        zone = rng.integers(1, 10, n)
+        section = rng.integers(1, 10, n)
+        plat = rng.integers(1, 1000, n)
+        parcel = rng.integers(1, 1000, n)
+        keys.update(
+            f"{i}{z}{s}{p:03d}{q:03d}"
+            for i, z, s, p, q in zip(island, zone, section, plat, parcel)
+        )
+    return sorted(keys)[:count]
+
+
+def formatted(tmk):
+    return f"TMK ({tmk[0]}) {tmk[1]}-{tmk[2]}-{tmk[3:6]}:{tmk[6:9]}"
+
+
+def write_csvs(rng, parcels, lat, lon):
+    in_master = rng.random(len(parcels)) < MASTER_SHARE
+    with open(MASTER_CSV, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["parcel_id", "latitude", "longitude"])
+        w.writerows(zip(np.asarray(parcels)[in_master], lat[in_master], lon[in_master]))
+
+    # "longitude" holds the projected x and "latitude" the projected y
+    x, y = get_transformer(DEFAULT_DST_CRS, DEFAULT_SRC_CRS).transform(lon, lat)
+    with open(PROJECTED_CSV, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["parcel_id", "latitude", "longitude"])
+        w.writerows(zip(parcels, y, x))
+
+    in_supp = rng.random(len(parcels)) < SUPPRESSION_SHARE
+    weights = rng.random(len(parcels)).round(3)
+    with open(SUPPRESSION_CSV, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["TMK", "suppression_status"])
+        w.writerows(zip(np.asarray(parcels)[in_supp], weights[in_supp]))
+
+
+def evidence_doc(rng, index, transactions, parcels, lat, lon, names):
+    txs = []
+    for _ in range(transactions):
+        p = int(rng.integers(len(parcels)))
+        tmk = parcels[p]
+        tx = {
+            "grantor": names[rng.integers(len(names))],
+            "grantee": names[rng.integers(len(names))],
+            "amount": f"${rng.integers(1_000, 5_000_000):,}.{rng.integers(100):02d}",
+            "parcel_id": formatted(tmk) if rng.random() < FORMATTED_TMK_SHARE else tmk,
+            "parcel_valid": bool(rng.random() < 0.9),
+            "signing_date": f"{rng.integers(1990, 2025)}-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+            "registry_key": f"R-{rng.integers(10**8):08d}",
+            "escrow_id": f"E{rng.integers(10**6):06d}",
+            "related_entities": {
+                "former_grantors": [names[i] for i in rng.integers(len(names), size=rng.integers(0, 3))],
+                "intermediaries": [names[i] for i in rng.integers(len(names), size=rng.integers(0, 2))],
+            },
+        }
+        if rng.random() < INLINE_GPS_SHARE:
+            tx["gps"] = [float(lat[p]), float(lon[p])]
+        txs.append(tx)
+    return {
+        "certificate_number": f"BENCH-{index:06d}",
+        "sha256": f"{index:064x}",
+        "document": f"bench_{index:06d}.pdf",
+        "transactions": txs,
+    }
+
+
+def generate(workdir, files=1000, transactions=10, parcels=20_000, seed=0):
+    """Write a synthetic dataset into workdir. Returns a dict of its counts."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(workdir, "evidence"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        ids = parcel_ids(rng, parcels)
+        south, west, north, east = HAWAII_BOUNDS
+        lat = rng.uniform(south, north, parcels).round(6)
+        lon = rng.uniform(west, east, parcels).round(6)
+        write_csvs(rng, ids, lat, lon)
+
+        names = [f"Entity {i:04d} LLC" for i in range(NAMES)]
+        paths, texts = [], []
+        for i in range(files):
+            if texts and rng.random() < DUPLICATE_SHARE:
+                text = texts[rng.integers(len(texts))]
+            else:
+                doc = evidence_doc(rng, i, transactions, ids, lat, lon, names)
+                text = yaml.dump(doc, Dumper=SafeDumper, sort_keys=False)
+                texts.append(text)
+            path = os.path.join("evidence", f"bench_{i:06d}.yaml")
+            with open(path, "w") as f:
+                f.write(text)
+            paths.append(path)
+
+        with zipfile.ZipFile(BUNDLE_ZIP, "w", zipfile.ZIP_DEFLATED) as z:
+            for path in paths:
+                z.write(path, "yamls/" + os.path.basename(path))
+            z.write(MASTER_CSV, "csvs/" + os.path.basename(MASTER_CSV))
+    finally:
+        os.chdir(cwd)
+    return {
+        "files": files,
+        "distinct_files": len(texts),
+        "transactions": transactions,
+        "parcels": parcels,
+        "seed": seed,
+    }
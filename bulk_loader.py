@@ -0,0 +1,61 @@
+# bulk_loader.py
+"""
+Bulk-load write path shared by the DB builders.
+
+bulk_load() switches a connection to load-friendly PRAGMAs and one big
+transaction for the duration of a build, then puts the serving settings
+back. executemany_batched() streams rows into executemany() in fixed-size
+batches so a builder never holds a whole table in memory.
+"""
+import itertools
+from contextlib import contextmanager
+
+BATCH_SIZE = 5000
+
+# cache_size < 0 is in KiB: 256 MiB of page cache while loading
+BULK_CACHE_SIZE = -262144
+
+
+@contextmanager
+def bulk_load(conn, journal_mode="MEMORY", synchronous="OFF"):
+    """
+    Run the body as a single transaction with bulk-load PRAGMAs.
+
+    journal_mode="OFF" (or "MEMORY") with synchronous="OFF" is the fastest
+    but a crash mid-load can leave the file corrupt, so only use them on a
+    database that is thrown away on failure (a staged_build() file). For a
+    live DB pass journal_mode=None to leave its journal alone and
+    synchronous="NORMAL", which is still durable under WAL. The previous
+    settings are restored on exit.
+    """
+    conn.commit()  # journal_mode can't change inside a transaction
+    saved = {
+        name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+        for name in ("journal_mode", "synchronous", "cache_size", "temp_store")
+    }
+    if journal_mode:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    conn.execute(f"PRAGMA cache_size = {BULK_CACHE_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        for name, value in saved.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+
+def executemany_batched(conn, sql, rows, batch_size=BATCH_SIZE):
+    """executemany() over any iterable of rows, batch_size at a time. Returns the row count."""
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return count
+        conn.executemany(sql, batch)
+        count += len(batch)
@@ -1,13 +1,167 @@
 # database_builder.py
 import os
+import queue
+import hashlib
 import zipfile
 import sqlite3
-import yaml
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
-def build_database_from_zip(zip_path: str, out_db: str):
+from evidence_parser import load_yaml, natural_key, parse_files
+from bulk_loader import BATCH_SIZE, bulk_load, executemany_batched
+from db_access import enable_wal, staged_build
+from run_report import count, span
+from value_parser import parse_date
+
+PARCEL_COLUMNS = {"parcel_id", "latitude", "longitude"}
+CSV_CHUNK_ROWS = 100_000
+CSV_READERS = 4
+
+# one open ZipFile per bundle per process, so parser workers don't reopen
+# the archive (and re-read its central directory) for every member
+_open_zips = {}
+
+def _bundle(zip_path):
+    z = _open_zips.get(zip_path)
+    if z is None:
+        z = _open_zips[zip_path] = zipfile.ZipFile(zip_path, "r")
+    return z
+
+def _close_bundles():
+    for z in _open_zips.values():
+        z.close()
+    _open_zips.clear()
+
+def bundle_members(z):
+    """
+    Split a bundle's members into (yaml_names, csv_names): files directly
+    inside a "yamls/" or "csvs/" folder, at the root or one level down.
+    """
+    yamls, csvs = [], []
+    for info in z.infolist():
+        if info.is_dir():
+            continue
+        parts = info.filename.split("/")
+        folder = parts[-2] if len(parts) >= 2 else ""
+        name = parts[-1].lower()
+        if folder == "yamls" and name.endswith((".yaml", ".yml")):
+            yamls.append(info.filename)
+        elif folder == "csvs" and name.endswith(".csv"):
+            csvs.append(info.filename)
+    return yamls, csvs
+
+def unique_members(z, members):
+    """
+    Drop members whose bytes repeat an earlier member's, so each distinct
+    YAML is parsed once. The zip's CRC-32 and size pick the candidates
+    without reading anything; only those are hashed to confirm.
+    """
+    groups = {}
+    for m in members:
+        info = z.getinfo(m)
+        groups.setdefault((info.CRC, info.file_size), []).append(m)
+    unique = []
+    for group in groups.values():
+        seen = set()
+        for m in group:
+            if len(group) > 1:
+                with z.open(m) as f:
+                    digest = hashlib.file_digest(f, "sha256").hexdigest()
+                if digest in seen:
+                    continue
+                seen.add(digest)
+            unique.append(m)
+    order = {m: i for i, m in enumerate(members)}
+    return sorted(unique, key=order.get)
+
+def parse_bundle_member(item):
+    """Parser-worker side of the bundle ingest: one YAML member → transaction tuples."""
+    zip_path, member = item
+    with _bundle(zip_path).open(member) as f:
+        doc = load_yaml(f) or {}
+    cert = doc.get("certificate_number")
+    rows = []
+    for position, tx in enumerate(doc.get("transactions", [])):
+        row = (
+            cert,
+            tx.get("grantor"),
+            tx.get("grantee"),
+            tx.get("parcel_id"),
+            tx.get("signing_date"),
+        )
+        rows.append(row + (natural_key(position, *row), parse_date(tx.get("signing_date"))))
+    return rows
+
+def iter_csv_chunks(zip_path, members, chunksize=CSV_CHUNK_ROWS, readers=CSV_READERS):
+    """
+    Read parcel CSV members concurrently, `readers` threads each streaming
+    one member in `chunksize`-row DataFrames, but yield the chunks in member
+    order, so where a parcel_id is in several members the last one still
+    wins, as when they were read one by one. Each member's chunks go through
+    its own small bounded queue, so at most a few are in memory however
+    large the members are. Members without parcel_id/latitude/longitude
+    columns are skipped.
     """
-    Unzip a bundle of yamls + csvs, ingest into a fresh SQLite DB at out_db.
+    queues = [queue.Queue(maxsize=2) for _ in members]
+    stop = threading.Event()
+    done = object()
+
+    def put(chunks, item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(member, chunks):
+        try:
+            with zipfile.ZipFile(zip_path, "r") as z, z.open(member) as f:
+                for chunk in pd.read_csv(f, dtype=str, chunksize=chunksize):
+                    if not PARCEL_COLUMNS.issubset(chunk.columns) or stop.is_set():
+                        break
+                    put(chunks, chunk)
+        finally:
+            put(chunks, done)
+
+    # the pool starts members in order, so the one being drained is always running
+    with ThreadPoolExecutor(max_workers=readers) as pool:
+        futures = [pool.submit(read, m, q) for m, q in zip(members, queues)]
+        try:
+            for chunks in queues:
+                while True:
+                    item = chunks.get()
+                    if item is done:
+                        break
+                    yield item
+        finally:
+            stop.set()
+        for fut in futures:
+            fut.result()  # surface reader errors
+
+def parcel_rows(df):
+    """(parcel_id, latitude, longitude) tuples from a parcel CSV frame, without iterrows."""
+    return zip(
+        df["parcel_id"].tolist(),
+        df["latitude"].astype(float).tolist(),
+        df["longitude"].astype(float).tolist(),
+    )
+
+def create_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_parcel_id ON transactions(parcel_id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_certificate ON transactions(certificate_number)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_signing_epoch ON transactions(signing_epoch)"
+    )
+
+def build_database_from_zip(zip_path: str, out_db: str, workers=None):
+    """
+    Ingest a bundle of yamls + csvs into a fresh SQLite DB at out_db,
+    streaming members straight out of the zip (nothing is extracted).
+    The DB is built beside out_db and swapped in when complete.
     Expects:
       - zip contains a folder "yamls/" with your *_entities.yaml files
       - zip contains a folder "csvs/" with CSVs that have parcel_id, latitude, longitude
@@ -16,80 +170,87 @@ def build_database_from_zip(zip_path: str, out_db: str):
     # ensure output directory exists
     os.makedirs(os.path.dirname(out_db), exist_ok=True)
 
-    # prepare a temp extraction folder
-    tmpdir = os.path.join(os.path.dirname(out_db), "tmp_extract")
-    if os.path.exists(tmpdir):
-        for f in os.listdir(tmpdir):
-            os.remove(os.path.join(tmpdir, f))
-    else:
-        os.makedirs(tmpdir)
-
-    # extract zip
-    with zipfile.ZipFile(zip_path, "r") as z:
-        z.extractall(tmpdir)
-
-    # open SQLite
-    conn = sqlite3.connect(out_db)
-    cur = conn.cursor()
-
-    # create tables
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS parcels (
-      parcel_id TEXT PRIMARY KEY,
-      latitude REAL,
-      longitude REAL,
-      status TEXT
-    );
-    """)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS transactions (
-      certificate_number TEXT,
-      grantor TEXT,
-      grantee TEXT,
-      parcel_id TEXT,
-      signing_date TEXT,
-      FOREIGN KEY(parcel_id) REFERENCES parcels(parcel_id)
-    );
-    """)
-
-    # ingest YAMLs
-    yaml_dir = os.path.join(tmpdir, "yamls")
-    if os.path.isdir(yaml_dir):
-        for fname in os.listdir(yaml_dir):
-            if fname.lower().endswith((".yaml", ".yml")):
-                path = os.path.join(yaml_dir, fname)
-                with open(path, "r") as f:
-                    doc = yaml.safe_load(f)
-                cert = doc.get("certificate_number")
-                for tx in doc.get("transactions", []):
-                    cur.execute(
-                        "INSERT OR IGNORE INTO transactions VALUES (?,?,?,?,?);",
-                        (
-                            cert,
-                            tx.get("grantor"),
-                            tx.get("grantee"),
-                            tx.get("parcel_id"),
-                            tx.get("signing_date"),
-                        )
-                    )
-
-    # ingest CSVs
-    csv_dir = os.path.join(tmpdir, "csvs")
-    if os.path.isdir(csv_dir):
-        for fname in os.listdir(csv_dir):
-            if fname.lower().endswith(".csv"):
-                df = pd.read_csv(os.path.join(csv_dir, fname), dtype=str)
-                if {"parcel_id", "latitude", "longitude"}.issubset(df.columns):
-                    for _, r in df.iterrows():
-                        cur.execute(
+    with span("zip read"), zipfile.ZipFile(zip_path, "r") as z:
+        yaml_members, csv_members = bundle_members(z)
+        unique = unique_members(z, yaml_members)
+        count("files", len(unique))
+        count("duplicate_files", len(yaml_members) - len(unique))
+        count("bytes", sum(z.getinfo(m).file_size for m in unique + csv_members))
+        yaml_members = unique
+
+    # build into a staging DB next to out_db; it replaces out_db only once
+    # it is complete and validated, so readers never see a partial build
+    with staged_build(out_db) as stage:
+        conn = sqlite3.connect(stage.path)
+        cur = conn.cursor()
+
+        # create tables
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS parcels (
+          parcel_id TEXT PRIMARY KEY,
+          latitude REAL,
+          longitude REAL,
+          status TEXT
+        );
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+          certificate_number TEXT,
+          grantor TEXT,
+          grantee TEXT,
+          parcel_id TEXT,
+          signing_date TEXT,
+          natural_key INTEGER UNIQUE,
+          signing_epoch INTEGER,
+          FOREIGN KEY(parcel_id) REFERENCES parcels(parcel_id)
+        );
+        """)
+
+        try:
+            with bulk_load(conn):
+                # ingest YAMLs (parsed in a process pool, written here);
+                # a repeated natural_key is the same transaction: ignored
+                items = [(zip_path, m) for m in yaml_members]
+                sql = "INSERT OR IGNORE INTO transactions VALUES (?,?,?,?,?,?,?);"
+                before = conn.total_changes
+                parsed = iter(parse_files(items, parse_bundle_member, workers))
+                pending, parsed_rows = [], 0
+                while True:
+                    with span("yaml parse"):
+                        rows = next(parsed, None)
+                    if rows is None or len(pending) >= BATCH_SIZE:
+                        with span("insert"):
+                            conn.executemany(sql, pending)
+                        pending.clear()
+                    if rows is None:
+                        break
+                    pending.extend(rows)
+                    parsed_rows += len(rows)
+                tx_count = conn.total_changes - before
+                count("rows", tx_count)
+                count("duplicate_rows", parsed_rows - tx_count)
+
+                # ingest CSVs (read concurrently in chunks, written here)
+                chunks = iter(iter_csv_chunks(zip_path, csv_members))
+                while True:
+                    with span("csv read"):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    with span("insert parcels"):
+                        count("parcel_rows", executemany_batched(
+                            conn,
                             "INSERT OR REPLACE INTO parcels VALUES (?,?,?,NULL);",
-                            (
-                                r["parcel_id"],
-                                float(r["latitude"]),
-                                float(r["longitude"]),
-                            )
-                        )
-
-    # commit & close
-    conn.commit()
-    conn.close()
+                            parcel_rows(chunk),
+                        ))
+
+                # indexes last, so the load doesn't maintain them row by row
+                with span("index build"):
+                    create_indexes(conn)
+                with span("commit"):
+                    conn.commit()
+            enable_wal(conn)
+        finally:
+            _close_bundles()
+            conn.close()
+        stage.expect("transactions", tx_count)
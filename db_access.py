@@ -0,0 +1,246 @@
+# db_access.py
+"""
+Shared read-only access to data/hawaii.db for the Streamlit pages.
+
+Each process keeps one ReadPool per DB file: up to POOL_SIZE read-only
+connections (`mode=ro`, `PRAGMA query_only`, memory-mapped I/O, a busy
+timeout and a statement cache), handed out to one Streamlit script thread
+at a time and reused across reruns and sessions instead of reconnecting.
+
+The builders leave the DB in WAL mode (enable_wal), so readers keep
+reading the last committed state while an incremental ingest writes, rather
+than failing with "database is locked".
+
+Full rebuilds never touch the live file: staged_build() hands the builder a
+sibling staging DB, validates it (integrity_check plus expected row
+counts), renames it over the live DB and bumps the generation number in
+`<db>.generation`. Pools check that number on every borrow and drop
+connections opened on an older generation, so readers move to the new
+file on their next query and never see a half-built one.
+
+    from db_access import query_df, read_connection
+
+    df = query_df("SELECT ... WHERE parcel_id = ?", (pid,))
+    with read_connection() as conn:
+        hits = search(conn, text)
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from run_report import span
+
+DB_PATH = os.path.join("data", "hawaii.db")
+
+POOL_SIZE = 8
+MMAP_SIZE = 256 * 1024 * 1024
+CACHED_STATEMENTS = 256
+BUSY_TIMEOUT = 5.0  # seconds
+
+GENERATION_SUFFIX = ".generation"
+STAGING_SUFFIX = ".staging"
+
+
+def enable_wal(conn):
+    """Switch a writer's DB to WAL (persistent in the file), so readers don't block on it."""
+    conn.execute("PRAGMA journal_mode = WAL")
+
+
+def read_generation(path=DB_PATH):
+    """The DB's generation number: bumped each time a rebuild is swapped in."""
+    try:
+        with open(path + GENERATION_SUFFIX) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _remove(*paths):
+    for p in paths:
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def validate_database(path, expected_counts=None):
+    """
+    Raise ValueError unless `path` passes PRAGMA integrity_check and every
+    table in expected_counts has exactly that many rows.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if result != ["ok"]:
+            raise ValueError(f"integrity_check failed: {'; '.join(result[:5])}")
+        for table, expected in (expected_counts or {}).items():
+            actual = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            if actual != expected:
+                raise ValueError(f"{table} has {actual} rows, expected {expected}")
+    finally:
+        conn.close()
+
+
+def install_database(staging_path, path=DB_PATH):
+    """
+    Atomically rename a finished staging DB over `path` and bump its
+    generation. Returns the new generation number.
+    """
+    # the old file's WAL/shm must not be picked up by the new one
+    _remove(path + "-wal", path + "-shm")
+    os.replace(staging_path, path)
+    generation = read_generation(path) + 1
+    with open(path + GENERATION_SUFFIX + ".tmp", "w") as f:
+        f.write(str(generation))
+    os.replace(path + GENERATION_SUFFIX + ".tmp", path + GENERATION_SUFFIX)
+    return generation
+
+
+class StagedBuild:
+    """The staging DB a rebuild writes into; see staged_build()."""
+
+    def __init__(self, path):
+        self.path = path + STAGING_SUFFIX
+        self.expected_counts = {}
+
+    def expect(self, table, count):
+        """Require `table` to hold exactly `count` rows before the swap."""
+        self.expected_counts[table] = count
+
+
+@contextmanager
+def staged_build(path=DB_PATH):
+    """
+    Build a replacement for `path` off to the side:
+
+        with staged_build(DB_PATH) as stage:
+            conn = sqlite3.connect(stage.path)
+            ...                                   # build, commit, close
+            stage.expect("transactions", inserted)
+
+    On a clean exit the staging DB is validated and swapped in; if the body
+    or the validation fails it is deleted and the live DB is left as it was.
+    """
+    stage = StagedBuild(path)
+    staging_files = [stage.path + s for s in ("", "-journal", "-wal", "-shm")]
+    _remove(*staging_files)  # leftovers of a crashed build
+    try:
+        yield stage
+        with span("validate"):
+            validate_database(stage.path, stage.expected_counts)
+        with span("swap"):
+            generation = install_database(stage.path, path)
+        print(f"ℹ️ Swapped in {path} (generation {generation}).")
+    finally:
+        _remove(*staging_files)
+
+
+class ReadPool:
+    """A bounded pool of read-only connections to one SQLite file."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.generation = read_generation(path)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _check_generation(self):
+        """After a swap, close the idle connections still on the old file."""
+        generation = read_generation(self.path)
+        if generation != self.generation:
+            with self._lock:
+                if generation != self.generation:
+                    self.generation = generation
+                    self.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            timeout=BUSY_TIMEOUT,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn, self.generation
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; blocks while all POOL_SIZE are in use."""
+        self._check_generation()
+        with self._slots:
+            try:
+                entry = self._idle.get_nowait()
+                if entry[1] != self.generation:
+                    entry[0].close()
+                    entry = self._connect()
+            except queue.Empty:
+                entry = self._connect()
+            conn = entry[0]
+            try:
+                yield conn
+            except (sqlite3.DatabaseError, pd.errors.DatabaseError):
+                # don't hand out a connection that hit a DB-level error again
+                # (read_sql_query re-raises sqlite's errors as pandas' own)
+                conn.close()
+                raise
+            except BaseException:
+                self._release(entry)
+                raise
+            else:
+                self._release(entry)
+
+    def _release(self, entry):
+        conn, generation = entry
+        if conn.in_transaction:
+            conn.rollback()
+        if generation != self.generation:
+            conn.close()  # opened on a file that has since been swapped out
+        else:
+            self._idle.put(entry)
+
+    def close(self):
+        """Close every idle connection (borrowed ones are closed on return)."""
+        while True:
+            try:
+                self._idle.get_nowait()[0].close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=DB_PATH):
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ReadPool(path)
+        return pool
+
+
+@contextmanager
+def read_connection(path=DB_PATH):
+    with get_pool(path).connection() as conn:
+        yield conn
+
+
+def query(sql, params=(), path=DB_PATH):
+    """All rows of a parameterized query, on a pooled connection."""
+    with read_connection(path) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def query_one(sql, params=(), path=DB_PATH):
+    with read_connection(path) as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def query_df(sql, params=(), path=DB_PATH):
+    with read_connection(path) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
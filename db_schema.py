@@ -0,0 +1,297 @@
+# db_schema.py
+"""
+Relational schema for data/hawaii.db, as built by scripts/rebuild_db_from_yaml.py.
+
+  certificates          one row per distinct evidence file content (blob_sha256,
+                        see evidence_store.py)
+  transactions          one row per transaction, FK to its certificate and parcel;
+                        natural_key dedupes re-ingested evidence; amount_cents,
+                        currency and signing_epoch are parsed from the text
+                        columns at ingest (value_parser.py) for range queries
+  tmk_parcels           one row per distinct parcel_id, with its canonical TMK
+                        key (tmk_parser.py) and master-CSV coords
+  entities              one row per distinct name (grantors, grantees, ...);
+                        is_json marks structured/numeric entries kept as JSON text
+  transaction_entities  role link: (transaction, entity, role, position)
+  search_index          FTS5 over entity names, registry keys, escrow IDs and
+                        transfer banks (see entity_search.py for queries)
+  parcel_rtree          R*Tree over each transaction's effective lat/lon, for
+                        viewport queries (see map_data.py)
+  map_clusters          precomputed grid clusters per zoom level (map_data.py)
+  suppression_grid      precomputed suppression-weight aggregates per zoom level
+
+A `parcels` view rebuilds the old flat one-row-per-transaction table
+(including the JSON-text entity columns), so pages that read `parcels`
+keep working unchanged.
+"""
+
+SCHEMA_VERSION = "11"
+
+# search_index kinds besides "entity": transaction columns indexed by value
+SEARCH_KEY_COLUMNS = ("registry_key", "escrow_id", "transfer_bank")
+
+# roles in transaction_entities; the last three mirror related_entities
+ROLE_GRANTOR = "grantor"
+ROLE_GRANTEE = "grantee"
+ROLE_FORMER_GRANTOR = "former_grantor"
+ROLE_TRUE_GRANTEE = "true_grantee"
+ROLE_INTERMEDIARY = "intermediary"
+
+TABLES = [
+    """
+    CREATE TABLE certificates (
+        id                  INTEGER PRIMARY KEY,
+        certificate_number  TEXT,
+        sha256              TEXT,
+        document            TEXT,
+        source_path         TEXT,
+        blob_sha256         TEXT,
+        duplicate_count     INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE tmk_parcels (
+        id         INTEGER PRIMARY KEY,
+        parcel_id  TEXT NOT NULL,
+        tmk_key    INTEGER,
+        latitude   REAL,
+        longitude  REAL
+    )
+    """,
+    """
+    CREATE TABLE entities (
+        id       INTEGER PRIMARY KEY,
+        name     TEXT NOT NULL,
+        is_json  BOOLEAN NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE transactions (
+        id                INTEGER PRIMARY KEY,
+        certificate_id    INTEGER NOT NULL REFERENCES certificates(id) ON DELETE CASCADE,
+        tmk_parcel_id     INTEGER REFERENCES tmk_parcels(id),
+        natural_key       INTEGER NOT NULL,
+        amount            TEXT,
+        parcel_valid      BOOLEAN,
+        gps_latitude      REAL,
+        gps_longitude     REAL,
+        registry_key      TEXT,
+        escrow_id         TEXT,
+        transfer_bank     TEXT,
+        country           TEXT,
+        routing_code      TEXT,
+        account_fragment  TEXT,
+        link              TEXT,
+        method            TEXT,
+        signing_date      TEXT,
+        amount_cents      INTEGER,
+        currency          TEXT,
+        signing_epoch     INTEGER
+    )
+    """,
+    # key columns first: older SQLite (< 3.41) integrity_check misreports
+    # NOT NULL columns declared before the key of a WITHOUT ROWID table
+    """
+    CREATE TABLE transaction_entities (
+        transaction_id  INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+        role            TEXT NOT NULL,
+        position        INTEGER NOT NULL,
+        entity_id       INTEGER NOT NULL REFERENCES entities(id),
+        PRIMARY KEY (transaction_id, role, position)
+    ) WITHOUT ROWID
+    """,
+    # ref_id is the entity id for kind "entity"; key kinds are looked up by value
+    """
+    CREATE VIRTUAL TABLE search_index USING fts5(
+        term,
+        kind UNINDEXED,
+        ref_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    # id is transactions.id / parcels.transaction_id; every box is a point
+    """
+    CREATE VIRTUAL TABLE parcel_rtree USING rtree(
+        id,
+        min_lat, max_lat,
+        min_lon, max_lon
+    )
+    """,
+    """
+    CREATE TABLE map_clusters (
+        zoom       INTEGER NOT NULL,
+        ix         INTEGER NOT NULL,
+        iy         INTEGER NOT NULL,
+        count      INTEGER NOT NULL,
+        latitude   REAL NOT NULL,
+        longitude  REAL NOT NULL,
+        PRIMARY KEY (zoom, ix, iy)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE suppression_grid (
+        zoom         INTEGER NOT NULL,
+        ix           INTEGER NOT NULL,
+        iy           INTEGER NOT NULL,
+        count        INTEGER NOT NULL,
+        weight_sum   REAL NOT NULL,
+        weight_mean  REAL NOT NULL,
+        latitude     REAL NOT NULL,
+        longitude    REAL NOT NULL,
+        PRIMARY KEY (zoom, ix, iy)
+    ) WITHOUT ROWID
+    """,
+]
+
+# created after the bulk load (see bulk_loader)
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_certificates_source_path ON certificates(source_path)",
+    "CREATE INDEX IF NOT EXISTS idx_certificates_number ON certificates(certificate_number)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_certificates_blob ON certificates(blob_sha256)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_tmk_parcels_parcel_id ON tmk_parcels(parcel_id)",
+    "CREATE INDEX IF NOT EXISTS idx_tmk_parcels_tmk_key ON tmk_parcels(tmk_key)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_entities_name ON entities(name, is_json)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_certificate ON transactions(certificate_id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_parcel ON transactions(tmk_parcel_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_natural_key ON transactions(natural_key)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_amount_cents ON transactions(amount_cents)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_signing_epoch ON transactions(signing_epoch)",
+    "CREATE INDEX IF NOT EXISTS idx_transaction_entities_entity "
+    "ON transaction_entities(entity_id, role)",
+    "CREATE INDEX IF NOT EXISTS idx_map_clusters_zoom_lat ON map_clusters(zoom, latitude)",
+    "CREATE INDEX IF NOT EXISTS idx_suppression_grid_zoom_lat ON suppression_grid(zoom, latitude)",
+] + [
+    f"CREATE INDEX IF NOT EXISTS idx_transactions_{col} ON transactions({col})"
+    for col in SEARCH_KEY_COLUMNS
+]
+
+
+def _entity_list(role):
+    # same text as json.dumps(names, ensure_ascii=False) wrote into the old
+    # table: names quoted, JSON entries as stored, ", " between items
+    # (json_group_array would write them compactly)
+    return f"""COALESCE((
+        SELECT '[' || group_concat(CASE WHEN is_json THEN name ELSE json_quote(name) END, ', ')
+               || ']' FROM (
+            SELECT e.name, e.is_json FROM transaction_entities te
+            JOIN entities e ON e.id = te.entity_id
+            WHERE te.transaction_id = t.id AND te.role = '{role}'
+            ORDER BY te.position
+        )
+    ), '[]')"""
+
+
+# Inline GPS wins over the parcel's master coords, as in the old flat build.
+# The grantor/grantee joins are single primary-key probes into the link table.
+PARCELS_VIEW = f"""
+    CREATE VIEW parcels AS
+    SELECT
+        c.certificate_number AS certificate_id,
+        c.sha256,
+        c.document,
+        g.name  AS grantor,
+        ge.name AS grantee,
+        t.amount,
+        p.parcel_id,
+        t.parcel_valid,
+        CASE WHEN t.gps_latitude IS NULL AND t.gps_longitude IS NULL
+             THEN p.latitude ELSE t.gps_latitude END AS latitude,
+        CASE WHEN t.gps_latitude IS NULL AND t.gps_longitude IS NULL
+             THEN p.longitude ELSE t.gps_longitude END AS longitude,
+        t.registry_key,
+        t.escrow_id,
+        t.transfer_bank,
+        t.country,
+        t.routing_code,
+        t.account_fragment,
+        t.link,
+        t.method,
+        t.signing_date,
+        t.amount_cents,
+        t.currency,
+        t.signing_epoch,
+        {_entity_list(ROLE_FORMER_GRANTOR)} AS former_grantors,
+        {_entity_list(ROLE_TRUE_GRANTEE)} AS true_grantees,
+        {_entity_list(ROLE_INTERMEDIARY)} AS intermediaries,
+        c.source_path,
+        t.id AS transaction_id,
+        p.tmk_key
+    FROM transactions t
+    JOIN certificates c ON c.id = t.certificate_id
+    LEFT JOIN tmk_parcels p ON p.id = t.tmk_parcel_id
+    LEFT JOIN transaction_entities tg
+           ON tg.transaction_id = t.id AND tg.role = '{ROLE_GRANTOR}' AND tg.position = 0
+    LEFT JOIN entities g ON g.id = tg.entity_id
+    LEFT JOIN transaction_entities tge
+           ON tge.transaction_id = t.id AND tge.role = '{ROLE_GRANTEE}' AND tge.position = 0
+    LEFT JOIN entities ge ON ge.id = tge.entity_id
+"""
+
+VIEWS = [PARCELS_VIEW]
+
+
+def drop_schema(conn):
+    """Drop every table and view in the DB, including a legacy flat `parcels` table."""
+    objects = conn.execute(
+        "SELECT name, type, sql FROM sqlite_master WHERE type IN ('table', 'view') "
+        "AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    # views first, then virtual tables (which take their shadow tables along)
+    objects.sort(key=lambda o: (o[1] != "view", not (o[2] or "").startswith("CREATE VIRTUAL")))
+    for name, kind, _ in objects:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone():
+            conn.execute(f'DROP {kind.upper()} "{name}"')
+
+
+def create_schema(conn):
+    drop_schema(conn)
+    for ddl in TABLES + VIEWS:
+        conn.execute(ddl)
+
+
+def create_indexes(conn):
+    for ddl in INDEXES:
+        conn.execute(ddl)
+
+
+def prune_orphans(conn):
+    """
+    Remove parcels and entities no transaction refers to any more, so an
+    incrementally updated DB holds the same rows as a full rebuild.
+    """
+    conn.execute(
+        "DELETE FROM entities WHERE id NOT IN (SELECT entity_id FROM transaction_entities)"
+    )
+    conn.execute(
+        "DELETE FROM tmk_parcels WHERE id NOT IN "
+        "(SELECT tmk_parcel_id FROM transactions WHERE tmk_parcel_id IS NOT NULL)"
+    )
+
+
+def refresh_search_index(conn):
+    """
+    Repopulate search_index from entities and the distinct key values in
+    transactions. Set-based, so it costs one pass over each source.
+    """
+    conn.execute("DELETE FROM search_index")
+    conn.execute(
+        "INSERT INTO search_index (term, kind, ref_id) SELECT name, 'entity', id FROM entities"
+    )
+    for col in SEARCH_KEY_COLUMNS:
+        conn.execute(
+            f"INSERT INTO search_index (term, kind, ref_id) "
+            f"SELECT DISTINCT {col}, '{col}', NULL FROM transactions "
+            f"WHERE {col} IS NOT NULL AND {col} != ''"
+        )
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+def refresh_spatial_index(conn):
+    """Repopulate parcel_rtree from the located rows of the parcels view."""
+    conn.execute("DELETE FROM parcel_rtree")
+    conn.execute(
+        "INSERT INTO parcel_rtree (id, min_lat, max_lat, min_lon, max_lon) "
+        "SELECT transaction_id, latitude, latitude, longitude, longitude FROM parcels "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )
@@ -0,0 +1,100 @@
+# entity_search.py
+"""
+Query API over the FTS5 search_index built by scripts/rebuild_db_from_yaml.py.
+
+Every word of the user's text is matched as a prefix ("haw bank" finds
+"Hawaii National Bank"), and hits are ranked by bm25. Entity hits carry the
+entity id; registry keys, escrow IDs and transfer banks are matched by value.
+"""
+import re
+
+from db_schema import SEARCH_KEY_COLUMNS
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 prefix query, or None if it has no words."""
+    words = _WORD.findall(text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def search(conn, text, kinds=None, limit=50):
+    """
+    Ranked matches for `text`: a list of dicts with kind, term and ref_id
+    (the entity id for kind "entity", else None). `kinds` restricts the
+    search to e.g. ("entity",) or ("escrow_id", "registry_key").
+    """
+    query = fts_query(text)
+    if query is None:
+        return []
+    sql = "SELECT kind, term, ref_id FROM search_index WHERE search_index MATCH ?"
+    params = [query]
+    if kinds:
+        sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+        params.extend(kinds)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    return [
+        {"kind": kind, "term": term, "ref_id": ref_id}
+        for kind, term, ref_id in conn.execute(sql, params)
+    ]
+
+
+def entity_profile(conn, entity_id):
+    """Roles, source files, parcels and amounts linked to one entity."""
+    def column(sql):
+        return sorted(
+            str(v) for (v,) in conn.execute(sql, (entity_id,)) if v is not None and v != ""
+        )
+
+    return {
+        "roles": column(
+            "SELECT DISTINCT role FROM transaction_entities WHERE entity_id = ?"
+        ),
+        "files": column(
+            "SELECT DISTINCT c.source_path FROM transaction_entities te "
+            "JOIN transactions t ON t.id = te.transaction_id "
+            "JOIN certificates c ON c.id = t.certificate_id WHERE te.entity_id = ?"
+        ),
+        "parcels": column(
+            "SELECT DISTINCT p.parcel_id FROM transaction_entities te "
+            "JOIN transactions t ON t.id = te.transaction_id "
+            "JOIN tmk_parcels p ON p.id = t.tmk_parcel_id WHERE te.entity_id = ?"
+        ),
+        "amounts": column(
+            "SELECT DISTINCT t.amount FROM transaction_entities te "
+            "JOIN transactions t ON t.id = te.transaction_id WHERE te.entity_id = ?"
+        ),
+    }
+
+
+def matching_transaction_ids(conn, text):
+    """
+    Ids of transactions linked to any search hit for `text`: through the
+    entity link table for names, or by value for the key columns. Every
+    hit counts, not just the best-ranked ones, since callers filter on the
+    result.
+    """
+    query = fts_query(text)
+    if query is None:
+        return set()
+    ids = {
+        tid for (tid,) in conn.execute(
+            "SELECT te.transaction_id FROM search_index s "
+            "JOIN transaction_entities te ON te.entity_id = s.ref_id "
+            "WHERE search_index MATCH ? AND s.kind = 'entity'",
+            (query,),
+        )
+    }
+    for col in SEARCH_KEY_COLUMNS:
+        ids.update(
+            tid for (tid,) in conn.execute(
+                f"SELECT t.id FROM search_index s JOIN transactions t ON t.{col} = s.term "
+                "WHERE search_index MATCH ? AND s.kind = ?",
+                (query, col),
+            )
+        )
+    return ids
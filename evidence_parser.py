@@ -0,0 +1,67 @@
+# evidence_parser.py
+"""
+Shared YAML parsing stage for the DB builders.
+
+Files are fanned out to a process pool and parsed with libyaml's CSafeLoader
+when PyYAML was built against it (falling back to the pure-Python SafeLoader).
+Results come back in input order, so one writer connection can insert them
+as they stream in.
+"""
+import os
+import json
+import hashlib
+import multiprocessing
+import yaml
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream):
+    """yaml.safe_load, but through the C loader when available."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_yaml_file(path):
+    with open(path, "rb") as f:
+        return load_yaml(f)
+
+
+def natural_key(*parts):
+    """
+    Deterministic 63-bit key for a parsed row: a hash of its identifying
+    parts (canonical JSON), so ingesting the same evidence twice yields the
+    same key and a UNIQUE index turns the second insert into a no-op.
+    """
+    text = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str, separators=(",", ":"))
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big") >> 1
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def parse_files(items, parse_fn, workers=None, chunksize=None):
+    """
+    Yield parse_fn(item) for every item, in order.
+
+    parse_fn must be a module-level function (it is pickled to the workers)
+    and should catch its own parse errors: an exception raised in a worker
+    aborts the whole run. With a single worker, or a single item, everything
+    runs in-process and no pool is started.
+    """
+    items = list(items)
+    if workers is None:
+        workers = default_workers()
+    workers = min(workers, len(items))
+
+    if workers <= 1:
+        for item in items:
+            yield parse_fn(item)
+        return
+
+    if chunksize is None:
+        # a few chunks per worker keeps them all busy without per-file IPC
+        chunksize = max(1, min(64, len(items) // (workers * 4)))
+
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(parse_fn, items, chunksize)
@@ -0,0 +1,266 @@
+# evidence_store.py
+"""
+Content index behind evidence/.
+
+data/evidence_store.db records each distinct evidence file content (a
+"blob", keyed by its sha256, with its certificate number) and, per file in
+evidence/ (an alias of its blob), its hash, upload time and the
+(size, mtime_ns) it had when hashed. The files themselves stay where they
+are; the store only indexes them, so the same certificate uploaded under
+three names is still parsed and inserted once, since the builders key
+certificates by blob hash, and an edited file just gets a new hash.
+
+sync() walks evidence/ and re-hashes only files whose stat changed, so the
+builders get every file's hash without reading unchanged files. It doubles
+as the evidence catalog: search() pages through it by name, certificate
+number, upload time or hash without touching the directory, and rescan()
+only walks it when the directory's mtime moved.
+
+    rec = save_evidence(up)          # uploader pages
+    hashes = sync()                  # {"evidence/x.yaml": sha256, ...}
+    rows, total = search("KAH", page=2)
+"""
+import os
+import re
+import time
+import hashlib
+import sqlite3
+
+from upload_sink import save_upload
+
+EVIDENCE_DIR = "evidence"
+STORE_DB = os.path.join("data", "evidence_store.db")
+EVIDENCE_EXTENSIONS = (".yaml", ".yml")
+
+PAGE_SIZE = 50
+# how much of a file to scan for its top-level certificate number
+CERT_SCAN_BYTES = 64 * 1024
+CERT_PATTERN = re.compile(
+    rb"^(?:certificate_number|cert_id):[ \t]*[\"']?([^\"'#\r\n]*?)[\"']?[ \t]*(?:#.*)?$", re.M
+)
+SORT_COLUMNS = {
+    "name": "a.name",
+    "certificate": "b.certificate_number",
+    "uploaded": "a.added_at DESC",
+}
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS blobs (
+        sha256              TEXT PRIMARY KEY,
+        size                INTEGER NOT NULL,
+        added_at            REAL NOT NULL,
+        certificate_number  TEXT
+    )
+    """,
+    # name is the alias's path relative to the evidence dir
+    """
+    CREATE TABLE IF NOT EXISTS aliases (
+        name      TEXT PRIMARY KEY,
+        sha256    TEXT NOT NULL REFERENCES blobs(sha256),
+        size      INTEGER NOT NULL,
+        mtime_ns  INTEGER NOT NULL,
+        added_at  REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS store_meta (
+        key    TEXT PRIMARY KEY,
+        value  TEXT
+    )
+    """,
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_aliases_sha256 ON aliases(sha256)",
+    "CREATE INDEX IF NOT EXISTS idx_aliases_added_at ON aliases(added_at)",
+    "CREATE INDEX IF NOT EXISTS idx_blobs_certificate ON blobs(certificate_number)",
+]
+
+
+def connect(path=STORE_DB):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10.0)
+    conn.execute("PRAGMA journal_mode = WAL")
+    for ddl in TABLES:
+        conn.execute(ddl)
+    for ddl in INDEXES:
+        conn.execute(ddl)
+    return conn
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_certificate_number(path):
+    """
+    The file's top-level certificate_number (or cert_id), from a line scan
+    of its head rather than a YAML parse; "" when there is none.
+    """
+    with open(path, "rb") as f:
+        m = CERT_PATTERN.search(f.read(CERT_SCAN_BYTES))
+    return m.group(1).decode("utf-8", "replace").strip() if m else ""
+
+
+def add_file(path, sha256, evidence_dir=EVIDENCE_DIR, conn=None):
+    """
+    Record the evidence file at `path` (content hash `sha256`) in the
+    store as an alias of its blob, adding the blob on its first sighting.
+    Returns the alias name.
+    """
+    own = conn is None
+    conn = conn or connect()
+    try:
+        st = os.stat(path)
+        name = os.path.relpath(path, evidence_dir)
+        now = time.time()
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (sha256, size, added_at, certificate_number) "
+            "VALUES (?, ?, ?, ?)",
+            (sha256, st.st_size, now, read_certificate_number(path)),
+        )
+        # a re-saved alias with the same content keeps its original upload time
+        conn.execute(
+            "INSERT INTO aliases (name, sha256, size, mtime_ns, added_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET sha256 = excluded.sha256, size = excluded.size, "
+            "mtime_ns = excluded.mtime_ns, added_at = CASE WHEN aliases.sha256 = excluded.sha256 "
+            "THEN aliases.added_at ELSE excluded.added_at END",
+            (name, sha256, st.st_size, st.st_mtime_ns, now),
+        )
+        if own:
+            conn.commit()
+        return name
+    finally:
+        if own:
+            conn.close()
+
+
+def save_evidence(upload, evidence_dir=EVIDENCE_DIR):
+    """save_upload() into the evidence dir, then adopt the file into the store."""
+    rec = save_upload(upload, evidence_dir)
+    add_file(rec.path, rec.sha256, evidence_dir)
+    return rec
+
+
+def iter_evidence_files(evidence_dir=EVIDENCE_DIR):
+    for root, _, files in os.walk(evidence_dir):
+        for fname in sorted(files):
+            if fname.lower().endswith(EVIDENCE_EXTENSIONS):
+                yield os.path.join(root, fname)
+
+
+def sync(evidence_dir=EVIDENCE_DIR):
+    """
+    Bring the store in line with evidence_dir and return {path: sha256} for
+    every evidence file in it. Files whose size/mtime match their alias
+    record aren't read; new or changed ones are hashed and adopted, and
+    aliases of deleted files are dropped (their blobs stay until gc()).
+    """
+    conn = connect()
+    try:
+        dir_mtime = os.stat(evidence_dir).st_mtime_ns if os.path.isdir(evidence_dir) else 0
+        known = {
+            name: (sha, size, mtime_ns)
+            for name, sha, size, mtime_ns in conn.execute(
+                "SELECT name, sha256, size, mtime_ns FROM aliases"
+            )
+        }
+        hashes = {}
+        with conn:
+            for path in iter_evidence_files(evidence_dir):
+                name = os.path.relpath(path, evidence_dir)
+                st = os.stat(path)
+                prev = known.pop(name, None)
+                if prev and prev[1] == st.st_size and prev[2] == st.st_mtime_ns:
+                    hashes[path] = prev[0]
+                    continue
+                hashes[path] = sha = file_sha256(path)
+                add_file(path, sha, evidence_dir, conn)
+            conn.executemany("DELETE FROM aliases WHERE name = ?", [(n,) for n in known])
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)",
+                (_dir_key(evidence_dir), str(dir_mtime)),
+            )
+        return hashes
+    finally:
+        conn.close()
+
+
+def gc():
+    """Forget blobs no alias refers to any more. Returns how many were removed."""
+    conn = connect()
+    try:
+        with conn:
+            orphans = [sha for (sha,) in conn.execute(
+                "SELECT sha256 FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM aliases)"
+            )]
+            conn.executemany("DELETE FROM blobs WHERE sha256 = ?", [(s,) for s in orphans])
+        return len(orphans)
+    finally:
+        conn.close()
+
+
+def _dir_key(evidence_dir):
+    return "dir_mtime:" + os.path.abspath(evidence_dir)
+
+
+def rescan(evidence_dir=EVIDENCE_DIR, force=False):
+    """
+    sync() if evidence_dir's mtime changed since the last one (a file was
+    added, removed or renamed in it), or when forced. Returns whether it ran.
+    In-place edits and changes inside subfolders need force=True.
+    """
+    if not os.path.isdir(evidence_dir):
+        return False
+    if not force:
+        conn = connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM store_meta WHERE key = ?", (_dir_key(evidence_dir),)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row and row[0] == str(os.stat(evidence_dir).st_mtime_ns):
+            return False
+    sync(evidence_dir)
+    return True
+
+
+def search(query="", page=0, page_size=PAGE_SIZE, sort="name"):
+    """
+    One page of the catalog: (rows, total matching). `query` matches a
+    substring of the file name or certificate number, or a sha256 prefix.
+    Rows are dicts with name, certificate_number, uploaded_at, size, sha256.
+    """
+    where, params = "", []
+    query = query.strip()
+    if query:
+        like = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where = "WHERE a.name LIKE ? ESCAPE '\\' OR b.certificate_number LIKE ? ESCAPE '\\'"
+        params = [like, like]
+        if re.fullmatch(r"[0-9a-fA-F]{6,64}", query):
+            # hash prefix: a range scan on idx_aliases_sha256
+            where += " OR (a.sha256 >= ? AND a.sha256 < ?)"
+            prefix = query.lower()
+            params += [prefix, prefix + "~"]
+    order = SORT_COLUMNS.get(sort, SORT_COLUMNS["name"])
+    conn = connect()
+    try:
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM aliases a JOIN blobs b ON b.sha256 = a.sha256 {where}", params
+        ).fetchone()[0]
+        rows = conn.execute(
+            "SELECT a.name, b.certificate_number, a.added_at, a.size, a.sha256 "
+            f"FROM aliases a JOIN blobs b ON b.sha256 = a.sha256 {where} "
+            f"ORDER BY {order}, a.name LIMIT ? OFFSET ?",
+            params + [page_size, page * page_size],
+        ).fetchall()
+    finally:
+        conn.close()
+    keys = ("name", "certificate_number", "uploaded_at", "size", "sha256")
+    return [dict(zip(keys, r)) for r in rows], total
@@ -0,0 +1,256 @@
+# map_data.py
+"""
+Viewport queries for the map pages, backed by the parcel_rtree R*Tree.
+
+Bounding boxes are (south, west, north, east) in WGS84 degrees. Pages fetch
+the current viewport plus a margin, and only go back to the DB once the user
+pans or zooms outside what was already fetched.
+
+parcel_rtree holds one point per transaction; the counts, markers and
+clusters here are per parcel (PARCEL_GROUP), identified by its TMK key, so
+a parcel with several transfers, or written as both "(3) 8-9-014:053" and
+"389014053", is shown and counted once. A parcel id that isn't a TMK counts
+by its text, and a transaction without one as a parcel of its own.
+
+For big viewports the map doesn't get points at all: map_clusters holds
+grid clusters (count + centroid) per zoom level, precomputed at rebuild
+time by refresh_map_clusters(), and render_tier() picks which to draw.
+suppression_grid does the same for the suppression heat map, with the
+count, sum and mean of the suppression weight per cell.
+"""
+import numpy as np
+import pandas as pd
+
+HAWAII_CENTER = (21.3156, -157.8586)
+HAWAII_ZOOM = 9
+
+# the main Hawaiian islands, used before the map has reported its bounds
+HAWAII_BOUNDS = (18.8, -160.3, 22.3, -154.7)
+
+# extra fetched area around the viewport, as a fraction of its size
+VIEWPORT_MARGIN = 0.5
+
+# rendering tiers, see render_tier()
+MARKER_MIN_ZOOM = 15
+MARKER_LIMIT = 1_000
+FAST_CLUSTER_LIMIT = 50_000
+
+# precomputed grid clusters: one level per zoom, cells ~CLUSTER_CELL_PX wide
+CLUSTER_ZOOMS = range(5, 17)
+CLUSTER_CELL_PX = 64
+
+# suppression heat map: a few resolutions, finer cells than the clusters
+HEAT_ZOOMS = (6, 8, 10, 12, 14, 16)
+HEAT_CELL_PX = 16
+
+# one group per parcel over rows of the parcels view: TMK keys are integers
+# and the fallbacks tagged text, so the three kinds never collide
+PARCEL_GROUP = "COALESCE(p.tmk_key, 'parcel:' || p.parcel_id, 'transaction:' || p.transaction_id)"
+
+
+def expand_bbox(bbox, margin=VIEWPORT_MARGIN):
+    """Grow a bbox by `margin` × its height/width on every side."""
+    south, west, north, east = bbox
+    dlat = (north - south) * margin
+    dlon = (east - west) * margin
+    return (south - dlat, west - dlon, north + dlat, east + dlon)
+
+
+def bbox_contains(outer, inner):
+    return (
+        outer[0] <= inner[0] and outer[1] <= inner[1]
+        and outer[2] >= inner[2] and outer[3] >= inner[3]
+    )
+
+
+def bounds_from_folium(bounds):
+    """st_folium's {"_southWest": {...}, "_northEast": {...}} → bbox, or None."""
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        bbox = (float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    if bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+        return None
+    return bbox
+
+
+def parcels_in_bbox(conn, bbox, limit=None):
+    """parcel_id/latitude/longitude of each parcel inside bbox (one row per parcel)."""
+    south, west, north, east = bbox
+    sql = f"""
+        SELECT p.parcel_id, p.latitude, p.longitude
+        FROM parcel_rtree r
+        JOIN parcels p ON p.transaction_id = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ?
+          AND r.max_lon >= ? AND r.min_lon <= ?
+        GROUP BY {PARCEL_GROUP}
+    """
+    params = [south, north, west, east]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return pd.read_sql_query(sql, conn, params=params).astype(
+        {"latitude": float, "longitude": float}
+    )
+
+
+def count_in_bbox(conn, bbox):
+    """Number of distinct parcels inside bbox."""
+    south, west, north, east = bbox
+    return conn.execute(
+        "SELECT COUNT(DISTINCT COALESCE(tp.tmk_key, 'parcel:' || tp.parcel_id, 'transaction:' || t.id)) "
+        "FROM parcel_rtree r "
+        "JOIN transactions t ON t.id = r.id "
+        "LEFT JOIN tmk_parcels tp ON tp.id = t.tmk_parcel_id "
+        "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?",
+        (south, north, west, east),
+    ).fetchone()[0]
+
+
+def render_tier(count, zoom):
+    """
+    How to draw `count` points at `zoom`:
+      "markers"  individual markers, only zoomed in and few points
+      "fast"     client-side FastMarkerCluster fed straight from arrays
+      "grid"     server-precomputed grid clusters for this zoom level
+    """
+    if zoom >= MARKER_MIN_ZOOM and count <= MARKER_LIMIT:
+        return "markers"
+    if count <= FAST_CLUSTER_LIMIT:
+        return "fast"
+    return "grid"
+
+
+def viewport_data(conn, bbox, zoom):
+    """
+    What the map viewer fetches for a viewport: (count, tier, frame), where
+    frame holds grid clusters for the "grid" tier and parcel rows otherwise.
+    """
+    count = count_in_bbox(conn, bbox)
+    tier = render_tier(count, zoom)
+    if tier == "grid":
+        # server-side clusters precomputed for this zoom level
+        return count, tier, clusters_in_bbox(conn, bbox, zoom)
+    return count, tier, parcels_in_bbox(conn, bbox)
+
+
+def cell_degrees(zoom, cell_px=CLUSTER_CELL_PX):
+    """Grid cell size in degrees for a zoom level (256 px tiles, 360° at zoom 0)."""
+    return 360.0 / (2 ** zoom) * (cell_px / 256.0)
+
+
+def grid_aggregate(lat, lon, cell_deg, weight=None):
+    """
+    Bin points into cell_deg × cell_deg cells with NumPy.
+    Returns a DataFrame with ix, iy, count, latitude/longitude (centroid),
+    and weight_sum/weight_mean when `weight` is given.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    iy = np.floor(lat / cell_deg).astype(np.int64)
+    ix = np.floor(lon / cell_deg).astype(np.int64)
+    cells, inverse = np.unique(np.stack([ix, iy], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    count = np.bincount(inverse)
+    out = {
+        "ix": cells[:, 0],
+        "iy": cells[:, 1],
+        "count": count,
+        "latitude": np.bincount(inverse, weights=lat) / count,
+        "longitude": np.bincount(inverse, weights=lon) / count,
+    }
+    if weight is not None:
+        wsum = np.bincount(inverse, weights=np.asarray(weight, dtype=np.float64))
+        out["weight_sum"] = wsum
+        out["weight_mean"] = wsum / count
+    return pd.DataFrame(out)
+
+
+def refresh_map_clusters(conn):
+    """Recompute map_clusters for every level in CLUSTER_ZOOMS from the located parcels."""
+    pts = pd.read_sql_query(
+        "SELECT p.latitude, p.longitude FROM parcels p "
+        "WHERE p.latitude IS NOT NULL AND p.longitude IS NOT NULL "
+        f"GROUP BY {PARCEL_GROUP}",
+        conn,
+    )
+    conn.execute("DELETE FROM map_clusters")
+    if pts.empty:
+        return
+    lat, lon = pts["latitude"].to_numpy(), pts["longitude"].to_numpy()
+    for zoom in CLUSTER_ZOOMS:
+        grid = grid_aggregate(lat, lon, cell_degrees(zoom))
+        conn.executemany(
+            "INSERT INTO map_clusters (zoom, ix, iy, count, latitude, longitude) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            zip(
+                [zoom] * len(grid),
+                grid["ix"].tolist(), grid["iy"].tolist(), grid["count"].tolist(),
+                grid["latitude"].tolist(), grid["longitude"].tolist(),
+            ),
+        )
+
+
+def clusters_in_bbox(conn, bbox, zoom):
+    """Precomputed grid clusters for the nearest stored zoom level inside bbox."""
+    zoom = min(max(int(zoom), CLUSTER_ZOOMS[0]), CLUSTER_ZOOMS[-1])
+    south, west, north, east = bbox
+    return pd.read_sql_query(
+        "SELECT latitude, longitude, count FROM map_clusters "
+        "WHERE zoom = ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+        conn,
+        params=(zoom, south, north, west, east),
+    )
+
+
+def refresh_suppression_grid(conn, weights):
+    """
+    Recompute suppression_grid from `weights`, a DataFrame of tmk_key and
+    numeric weight (see rebuild_db_from_yaml.load_suppression_weights),
+    joined on the TMK key to the located parcels, one point per parcel
+    however many transactions it has.
+    """
+    conn.execute("DELETE FROM suppression_grid")
+    if weights is None or weights.empty:
+        return
+    pts = pd.read_sql_query(
+        "SELECT tmk_key, latitude, longitude FROM parcels "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND tmk_key IS NOT NULL "
+        "GROUP BY tmk_key",
+        conn,
+    )
+    pts = pts.merge(weights, on="tmk_key", how="inner")
+    if pts.empty:
+        return
+    lat, lon, w = (pts[c].to_numpy() for c in ("latitude", "longitude", "weight"))
+    for zoom in HEAT_ZOOMS:
+        grid = grid_aggregate(lat, lon, cell_degrees(zoom, HEAT_CELL_PX), weight=w)
+        conn.executemany(
+            "INSERT INTO suppression_grid "
+            "(zoom, ix, iy, count, weight_sum, weight_mean, latitude, longitude) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(
+                [zoom] * len(grid),
+                grid["ix"].tolist(), grid["iy"].tolist(), grid["count"].tolist(),
+                grid["weight_sum"].tolist(), grid["weight_mean"].tolist(),
+                grid["latitude"].tolist(), grid["longitude"].tolist(),
+            ),
+        )
+
+
+def heat_level(zoom):
+    """The stored HEAT_ZOOMS level to draw at `zoom`: the finest one not finer than it."""
+    levels = [z for z in HEAT_ZOOMS if z <= zoom]
+    return levels[-1] if levels else HEAT_ZOOMS[0]
+
+
+def suppression_grid_in_bbox(conn, bbox, zoom):
+    """Suppression cells (centroid, count, weight_sum, weight_mean) for `zoom` inside bbox."""
+    south, west, north, east = bbox
+    return pd.read_sql_query(
+        "SELECT latitude, longitude, count, weight_sum, weight_mean FROM suppression_grid "
+        "WHERE zoom = ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+        conn,
+        params=(heat_level(zoom), south, north, west, east),
+    )
@@ -0,0 +1,155 @@
+# master_coords.py
+"""
+Vectorized parcel-coordinate lookup over the master TMK CSV.
+
+The CSV is parsed once into sorted int64 TMK keys (see tmk_parser.py) plus
+float64 lat/lon arrays, which are saved as .npy files in a sidecar directory next to the
+CSV (`<csv>.coords/`) together with the CSV's sha256. Later loads memory-map
+the sidecar instead of re-reading the CSV; a changed CSV hash rebuilds it.
+Lookups are a searchsorted join over a whole batch of parcel ids.
+"""
+import os
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+from tmk_parser import MISSING_KEY, tmk_keys
+
+SIDECAR_SUFFIX = ".coords"
+REQUIRED_COLUMNS = {"parcel_id", "latitude", "longitude"}
+
+
+class MasterCoords:
+    """Sorted int64 TMK keys with parallel lat/lon arrays."""
+
+    def __init__(self, keys, lat, lon, source=None):
+        self.keys = keys
+        self.lat = lat
+        self.lon = lon
+        self.source = source
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, parcel_ids):
+        """
+        Vectorized join of parcel_ids against the master keys.
+        Returns (lat, lon, found): float64 arrays (NaN where missing) and a
+        boolean mask. Ids are matched on their canonical TMK key.
+        """
+        return self.lookup_keys(tmk_keys(parcel_ids))
+
+    def lookup_keys(self, keys):
+        """lookup() for ids already encoded with tmk_parser.tmk_keys()."""
+        q = np.asarray(keys, dtype=np.int64)
+        lat = np.full(len(q), np.nan)
+        lon = np.full(len(q), np.nan)
+        if not len(self.keys) or not len(q):
+            return lat, lon, np.zeros(len(q), dtype=bool)
+
+        idx = np.searchsorted(self.keys, q)
+        idx[idx == len(self.keys)] = 0
+        found = (self.keys[idx] == q) & (q != MISSING_KEY)
+        lat[found] = self.lat[idx[found]]
+        lon[found] = self.lon[idx[found]]
+        return lat, lon, found
+
+
+def empty_coords():
+    return MasterCoords(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+
+
+def csv_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def sidecar_dir(csv_path):
+    return csv_path + SIDECAR_SUFFIX
+
+
+def parse_master_csv(path):
+    """
+    Parse the master CSV into MasterCoords, or None if it lacks the columns.
+    Rows whose parcel_id isn't a TMK are dropped; duplicate TMKs keep the
+    last row, as the old dict build did.
+    """
+    df = pd.read_csv(
+        path,
+        dtype=str,
+        usecols=lambda c: c.strip().lower() in REQUIRED_COLUMNS,
+    )
+    df.columns = [c.strip().lower() for c in df.columns]
+    if not REQUIRED_COLUMNS.issubset(df.columns):
+        return None
+
+    keys = tmk_keys(df["parcel_id"])
+    lat = pd.to_numeric(df["latitude"], errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df["longitude"], errors="coerce").to_numpy(dtype=np.float64)
+    keep = (keys != MISSING_KEY) & ~np.isnan(lat) & ~np.isnan(lon)
+
+    keys, lat, lon = keys[keep], lat[keep], lon[keep]
+
+    # np.unique keeps the first occurrence: reverse so the last row wins
+    keys, first = np.unique(keys[::-1], return_index=True)
+    last = len(lat) - 1 - first
+    return MasterCoords(keys, lat[last], lon[last], source=path)
+
+
+def save_sidecar(coords, csv_path, sha):
+    """Write the sidecar to a temp dir and rename it into place."""
+    target = sidecar_dir(csv_path)
+    tmp = tempfile.mkdtemp(prefix=".coords-", dir=os.path.dirname(csv_path) or ".")
+    np.save(os.path.join(tmp, "keys.npy"), coords.keys)
+    np.save(os.path.join(tmp, "lat.npy"), coords.lat)
+    np.save(os.path.join(tmp, "lon.npy"), coords.lon)
+    with open(os.path.join(tmp, "sha256"), "w") as f:
+        f.write(sha)
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.replace(tmp, target)
+
+
+def load_sidecar(csv_path, sha):
+    """Memory-map the sidecar if it matches the CSV's hash, else return None."""
+    target = sidecar_dir(csv_path)
+    try:
+        with open(os.path.join(target, "sha256")) as f:
+            if f.read().strip() != sha:
+                return None
+        return MasterCoords(
+            np.load(os.path.join(target, "keys.npy"), mmap_mode="r"),
+            np.load(os.path.join(target, "lat.npy"), mmap_mode="r"),
+            np.load(os.path.join(target, "lon.npy"), mmap_mode="r"),
+            source=csv_path,
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def load_master_coords(paths):
+    """
+    Coordinates from the first CSV in `paths` that exists and has
+    parcel_id/latitude/longitude columns. Returns None if there is none.
+    """
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        sha = csv_sha256(path)
+        coords = load_sidecar(path, sha)
+        if coords is not None:
+            return coords
+        coords = parse_master_csv(path)
+        if coords is None:
+            continue
+        try:
+            save_sidecar(coords, path, sha)
+        except OSError as e:
+            print(f"⚠️ Could not write coords sidecar for {path}: {e}")
+        return coords
+    return None
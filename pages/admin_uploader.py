@@ -2,7 +2,8 @@
 
 import os
 import sys
-import subprocess
+import time
+import datetime
 import streamlit as st
 
 #  ───  ensure repo root is on PYTHONPATH  ─────────────────────────────────────────────
@@ -11,16 +12,10 @@ ROOT = os.path.abspath(os.getcwd())
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-#  ───  import your rebuild functions  ────────────────────────────────────────────────
-try:
-    from ingest_yaml_to_db import rebuild_db_from_zip
-except ImportError:
-    rebuild_db_from_zip = None
-
-try:
-    from rebuild_db import rebuild_sqlite
-except ImportError:
-    rebuild_sqlite = None
+import rebuild_jobs
+import run_report
+from evidence_store import save_evidence
+from upload_sink import save_upload
 
 st.set_page_config(page_title="Admin Uploader", layout="wide")
 st.title("📂 Admin: Upload & Rebuild")
@@ -39,10 +34,8 @@ uploaded_csvs = st.file_uploader(
 )
 if uploaded_csvs:
     for up in uploaded_csvs:
-        dest = os.path.join(DATA_DIR, up.name)
-        with open(dest, "wb") as f:
-            f.write(up.getbuffer())
-        st.success(f"✅ `{up.name}` → `{dest}`")
+        rec = save_upload(up, DATA_DIR)
+        st.success(f"✅ `{rec.name}` → `{rec.path}`")
 
 st.markdown("### 2) Upload YAMLs → `/evidence`")
 uploaded_yamls = st.file_uploader(
@@ -50,37 +43,127 @@ uploaded_yamls = st.file_uploader(
 )
 if uploaded_yamls:
     for up in uploaded_yamls:
-        dest = os.path.join(EVIDENCE_DIR, up.name)
-        with open(dest, "wb") as f:
-            f.write(up.getbuffer())
-        st.success(f"✅ `{up.name}` → `{dest}`")
+        rec = save_evidence(up, EVIDENCE_DIR)
+        st.success(f"✅ `{rec.name}` → `{rec.path}`")
 
 st.markdown("### 3) Rebuild the SQLite Database")
-if st.button("🔄 Rebuild DB"):
-    try:
-        # 1) ingest YAMLs
-        if rebuild_db_from_zip:
-            rebuild_db_from_zip(zip_path=None, out_db=DB_PATH)
-        else:
-            # fallback to script
-            proc = subprocess.run(
-                ["python", "scripts/rebuild_db_from_yaml.py", "--out-db", DB_PATH],
-                capture_output=True, text=True
-            )
-            if proc.returncode:
-                raise RuntimeError(proc.stderr)
+st.caption(
+    "Rebuilds run in a background process (see `rebuild_jobs.py`); only one runs at a "
+    "time, and its progress shows here in every session."
+)
+
+# Rebuilds already running (from any session) are joined rather than duplicated
+col_inc, col_full = st.columns(2)
+if col_inc.button("🔄 Rebuild DB (incremental)"):
+    st.session_state["rebuild_job"] = rebuild_jobs.submit("incremental")
+if col_full.button("🏗️ Full rebuild"):
+    st.session_state["rebuild_job"] = rebuild_jobs.submit("full")
 
-        # 2) load CSVs / patch anything
-        if rebuild_sqlite:
-            rebuild_sqlite(DB_PATH)
+job = rebuild_jobs.active_job()
+if job is None and st.session_state.get("rebuild_job"):
+    job = rebuild_jobs.get_job(st.session_state["rebuild_job"])
+if job is None:
+    recent = rebuild_jobs.list_jobs(limit=1)
+    job = recent[0] if recent else None
+
+if job:
+    elapsed = rebuild_jobs.elapsed(job)
+    st.markdown(
+        f"**Job {job['id']}** ({job['kind']}) — `{job['status']}`"
+        + (f", stage *{job['stage']}*" if job["stage"] else "")
+    )
+    c1, c2, c3 = st.columns(3)
+    files_total = job["files_total"]
+    c1.metric("Files parsed", f"{job['files_done']}/{files_total if files_total is not None else '?'}")
+    c2.metric("Rows inserted", job["rows_inserted"])
+    c3.metric("Elapsed", f"{elapsed:.1f}s")
+
+    if job["status"] in rebuild_jobs.ACTIVE:
+        if files_total:
+            st.progress(min(job["files_done"] / files_total, 1.0))
+        if st.button("⏹️ Cancel rebuild", disabled=job["status"] == rebuild_jobs.CANCELLING):
+            rebuild_jobs.cancel(job["id"])
+            st.rerun()
+        # poll the job row until the worker finishes
+        time.sleep(1.0)
+        st.rerun()
+    else:
+        if job["status"] == rebuild_jobs.SUCCEEDED:
+            st.success("🏗️ Database rebuilt successfully!")
+        elif job["status"] == rebuild_jobs.CANCELLED:
+            st.warning("⚠️ Rebuild cancelled; the database was left as it was.")
         else:
-            proc = subprocess.run(
-                ["python", "rebuild_db.py", "--db", DB_PATH],
-                capture_output=True, text=True
-            )
-            if proc.returncode:
-                raise RuntimeError(proc.stderr)
+            st.error(f"🔴 Rebuild failed:\n```\n{job['message']}\n```")
+        if st.button("🔁 Retry"):
+            st.session_state["rebuild_job"] = rebuild_jobs.retry(job["id"])
+            st.rerun()
+        log = rebuild_jobs.read_log(job)
+        if log:
+            with st.expander("Worker log", expanded=job["status"] == rebuild_jobs.FAILED):
+                st.code(log)
+
+with st.expander("Recent rebuilds"):
+    jobs = rebuild_jobs.list_jobs(limit=20)
+    if jobs:
+        st.dataframe(
+            [
+                {
+                    "id": j["id"],
+                    "kind": j["kind"],
+                    "status": j["status"],
+                    "stage": j["stage"],
+                    "files": f"{j['files_done']}/{j['files_total'] if j['files_total'] is not None else '?'}",
+                    "rows": j["rows_inserted"],
+                    "started": datetime.datetime.fromtimestamp(j["started_at"] or j["created_at"])
+                    .strftime("%Y-%m-%d %H:%M:%S"),
+                    "elapsed (s)": round(rebuild_jobs.elapsed(j), 1),
+                    "retry of": j["retry_of"],
+                    "message": j["message"],
+                }
+                for j in jobs
+            ],
+            use_container_width=True,
+        )
+    else:
+        st.info("No rebuilds yet.")
 
-        st.success("🏗️ Database rebuilt successfully!")
-    except Exception as e:
-        st.error(f"🔴 Rebuild failed:\n```\n{e}\n```")
+with st.expander("Recent runs (timings)"):
+    n_runs = st.number_input("Show last", min_value=1, max_value=run_report.KEEP_REPORTS, value=10)
+    reports = run_report.load_reports(limit=int(n_runs))
+    if reports:
+        st.dataframe(
+            [
+                {
+                    "started": datetime.datetime.fromtimestamp(r["started_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+                    "run": r["name"],
+                    "status": r["status"],
+                    "seconds": round(r["seconds"], 2),
+                    "files": r["counters"].get("files"),
+                    "rows": r["counters"].get("rows"),
+                    "peak RSS (MB)": max(r["peak_rss_mb"], r["children_peak_rss_mb"]),
+                }
+                for r in reports
+            ],
+            use_container_width=True,
+        )
+        labels = [
+            f"{datetime.datetime.fromtimestamp(r['started_at']):%Y-%m-%d %H:%M:%S} · {r['name']}"
+            for r in reports
+        ]
+        picked = reports[labels.index(st.selectbox("Stage breakdown of", labels))]
+        st.dataframe(
+            sorted(
+                (
+                    {"stage": stage, "seconds": round(s["seconds"], 3), "calls": s["calls"],
+                     "share": f"{s['seconds'] / picked['seconds']:.0%}" if picked["seconds"] else "—"}
+                    for stage, s in picked["stages"].items()
+                ),
+                key=lambda row: -row["seconds"],
+            ),
+            use_container_width=True,
+        )
+        st.json({"counters": picked["counters"], "meta": picked["meta"], "error": picked["error"]})
+        if picked.get("profile"):
+            st.caption(f"cProfile dump: `{picked['profile']}` (open with `python -m pstats`)")
+    else:
+        st.info("No run reports yet. Builders and reprojection write one per run to `data/run_reports/`.")
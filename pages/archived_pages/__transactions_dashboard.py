@@ -1,64 +1,75 @@
+import os
+import sys
+import json
+import datetime
 import streamlit as st
-import pandas as pd
 
-st.set_page_config(page_title="Transaction Explorer", layout="wide")
-st.title("🧾 Transaction Explorer")
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
 
-if "yaml_data" not in st.session_state or not st.session_state.yaml_data:
-    st.warning("No YAML files loaded. Please upload files via the Home page.")
-    st.stop()
+from entity_search import matching_transaction_ids
+from db_access import DB_PATH, query_df, read_connection
+from value_parser import parse_date
 
-# Flatten all transactions from loaded YAML files
-records = []
-for file_data in st.session_state.yaml_data:
-    filename = file_data.get("_uploaded_filename", "unknown")
-    for tx in file_data.get("transactions", []):
-        tx = tx.get("transaction", tx)
-        records.append({
-            "Source File": filename,
-            "Grantor": tx.get("grantor"),
-            "Grantee": tx.get("grantee"),
-            "Beneficiary": tx.get("beneficiary"),
-            "Advisor": tx.get("advisor"),
-            "Trust": tx.get("trust"),
-            "Escrow #": tx.get("escrow_number"),
-            "Escrow Officer": tx.get("escrow_officer"),
-            "Amount": tx.get("amount"),
-            "Parcel": tx.get("parcel_id"),
-            "DLNR Match": tx.get("dlnr_match"),
-            "Date Closed": tx.get("date_closed"),
-            "Religious Assignment": tx.get("religious_assignment"),
-            "Overseas Transfer": tx.get("overseas_transfer"),
-        })
+st.set_page_config(page_title="Transaction Explorer", layout="wide")
+st.title("🧾 Transaction Explorer")
 
-if not records:
-    st.info("No transactions found in the loaded YAML files.")
+if not os.path.exists(DB_PATH):
+    st.warning("Database not found. Rebuild it from the evidence YAMLs first.")
     st.stop()
 
-# Convert to DataFrame
-df = pd.DataFrame(records)
-
 # Sidebar Filters
 st.sidebar.header("Filter Transactions")
-selected_entity = st.sidebar.text_input("Search by name (Grantor/Grantee/Beneficiary/Advisor)")
+selected_entity = st.sidebar.text_input("Search by name, registry key, escrow ID or bank")
 min_amount = st.sidebar.number_input("Minimum amount ($)", min_value=0, value=200000)
+filter_dates = st.sidebar.checkbox("Filter by signing date", value=False)
+if filter_dates:
+    signed_from = st.sidebar.date_input("Signed on or after", datetime.date(2000, 1, 1))
+    signed_to = st.sidebar.date_input("Signed on or before", datetime.date.today())
 hide_dlnr_matches = st.sidebar.checkbox("Hide DLNR-confirmed parcels", value=False)
 
-def parse_amount(val):
-    try:
-        return float(str(val).replace("$", "").replace(",", ""))
-    except:
-        return 0
-
-# Apply filters
-filtered_df = df.copy()
+sql = """
+    SELECT
+        source_path   AS "Source File",
+        grantor       AS "Grantor",
+        grantee       AS "Grantee",
+        escrow_id     AS "Escrow #",
+        registry_key  AS "Registry Key",
+        transfer_bank AS "Transfer Bank",
+        amount        AS "Amount",
+        currency      AS "Currency",
+        parcel_id     AS "Parcel",
+        parcel_valid  AS "DLNR Match",
+        signing_date  AS "Date Signed",
+        country       AS "Country"
+    FROM parcels
+    WHERE 1 = 1
+"""
+params = []
 if selected_entity:
-    filtered_df = filtered_df[filtered_df.apply(lambda row: selected_entity.lower() in str(row.values).lower(), axis=1)]
-
-filtered_df = filtered_df[filtered_df["Amount"].apply(parse_amount) >= min_amount]
+    # full-text index lookup instead of substring-matching every row
+    with read_connection() as conn:
+        ids = matching_transaction_ids(conn, selected_entity)
+    sql += " AND transaction_id IN (SELECT value FROM json_each(?))"
+    params.append(json.dumps(sorted(ids)))
+if min_amount > 0:
+    # amount_cents is parsed at ingest and indexed: a range scan, not a per-row parse
+    # the threshold is in dollars; amounts without a currency are taken as USD
+    sql += " AND amount_cents >= ? AND (currency = 'USD' OR currency IS NULL)"
+    params.append(int(min_amount * 100))
+if filter_dates:
+    sql += " AND signing_epoch BETWEEN ? AND ?"
+    params += [parse_date(signed_from), parse_date(signed_to)]
 if hide_dlnr_matches:
-    filtered_df = filtered_df[filtered_df["DLNR Match"] != True]
+    sql += " AND parcel_valid IS NOT 1"
+
+df = query_df(sql, params)
+
+if df.empty:
+    st.info("No transactions found.")
+    st.stop()
 
 # Display
-st.markdown(f"### Showing {len(filtered_df)} filtered transactions")
-st.dataframe(filtered_df, use_container_width=True)
+st.markdown(f"### Showing {len(df)} filtered transactions")
+st.dataframe(df, use_container_width=True)
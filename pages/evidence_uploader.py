@@ -1,7 +1,18 @@
 # File: <your repo>/pages/evidence_uploader.py
+import os
+import sys
 import streamlit as st
 from pathlib import Path
 
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
+
+import datetime
+from evidence_store import PAGE_SIZE, rescan, save_evidence, search
+
 # 1) Locate (or create) the evidence/ folder at your repo root
 EVIDENCE_DIR = Path(__file__).parent.parent / "evidence"
 EVIDENCE_DIR.mkdir(exist_ok=True)
@@ -24,19 +35,41 @@ uploaded = st.file_uploader(
 if uploaded:
     saved = []
     for up in uploaded:
-        dest = EVIDENCE_DIR / up.name
-        with open(dest, "wb") as f:
-            f.write(up.getbuffer())
-        saved.append(up.name)
+        rec = save_evidence(up, str(EVIDENCE_DIR))
+        saved.append(rec.name)
     st.success(f"✔ Saved {len(saved)} file(s): " + ", ".join(saved))
 
 st.markdown("---")
 
-# 3) Show a live listing of what's in evidence/
+# 3) Browse the evidence catalog (evidence_store.py), one page at a time;
+#    the folder is only re-walked when its mtime changed, or on demand
 st.subheader("Existing YAMLs in `evidence/`")
-files = sorted(EVIDENCE_DIR.glob("*.y*ml"))
-if not files:
+col_q, col_sort, col_rescan = st.columns([3, 1, 1])
+query = col_q.text_input("Search by file name, certificate number or sha256 prefix")
+sort = col_sort.selectbox("Sort by", ["name", "certificate", "uploaded"])
+if col_rescan.button("🔄 Rescan folder"):
+    rescan(str(EVIDENCE_DIR), force=True)
+else:
+    rescan(str(EVIDENCE_DIR))
+
+_, total = search(query, page_size=1)
+if not total:
     st.info("No YAML files found.")
 else:
-    for f in files:
-        st.write("•", f.name)
+    pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+    rows, total = search(query, page=int(page) - 1, sort=sort)
+    st.caption(f"{total} file(s)")
+    st.dataframe(
+        [
+            {
+                "file": r["name"],
+                "certificate": r["certificate_number"],
+                "uploaded": datetime.datetime.fromtimestamp(r["uploaded_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+                "size": r["size"],
+                "sha256": r["sha256"][:16],
+            }
+            for r in rows
+        ],
+        use_container_width=True,
+    )
@@ -1,33 +1,90 @@
+import os
+import sys
+from contextlib import nullcontext
+
+import numpy as np
 import streamlit as st
-import pandas as pd
 from streamlit_folium import st_folium
 import folium
+from folium.plugins import FastMarkerCluster
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
 
-def show(cur):
+from map_data import (
+    HAWAII_BOUNDS, HAWAII_CENTER, HAWAII_ZOOM,
+    bbox_contains, bounds_from_folium, expand_bbox, viewport_data,
+)
+from db_access import read_connection
+
+def show(cur=None):
     st.title("Map Viewer")
 
-    # Fetch parcel locations
-    df = pd.read_sql(
-        "SELECT parcel_id, latitude, longitude FROM parcels WHERE latitude IS NOT NULL AND longitude IS NOT NULL",
-        cur.connection,
-    ).astype({"latitude": float, "longitude": float})
+    # Viewport the user last left the map at; starts on Hawaii
+    view = st.session_state.setdefault("map_viewer_view", {
+        "center": HAWAII_CENTER,
+        "zoom": HAWAII_ZOOM,
+        "bounds": HAWAII_BOUNDS,
+    })
+
+    # Count parcels inside the viewport (plus a margin) via the R*Tree,
+    # then pick a display tier that keeps the page payload bounded
+    fetched = expand_bbox(view["bounds"])
+    with nullcontext(cur.connection) if cur is not None else read_connection() as conn:
+        count, tier, data = viewport_data(conn, fetched, view["zoom"])
 
-    if df.empty:
+    if not count and view["bounds"] == HAWAII_BOUNDS:
         st.warning("No parcel data available.")
         return
+    st.caption(f"{count} parcels in view")
+
+    m = folium.Map(location=list(view["center"]), zoom_start=view["zoom"])
+
+    if tier == "grid":
+        radius = 6 + 3 * np.log10(data["count"].to_numpy().clip(min=1))
+        for lat, lon, n, r in zip(
+            data["latitude"].tolist(), data["longitude"].tolist(),
+            data["count"].tolist(), radius.tolist(),
+        ):
+            folium.CircleMarker(
+                location=(lat, lon),
+                radius=r,
+                color="blue",
+                fill=True,
+                fill_opacity=0.6,
+                tooltip=f"{n} parcels",
+            ).add_to(m)
+    else:
+        points = data[["latitude", "longitude"]].to_numpy()
+        if tier == "fast":
+            # clustered in the browser, shipped as one flat array
+            FastMarkerCluster(data=points.tolist()).add_to(m)
+        else:
+            for lat, lon in points.tolist():
+                folium.CircleMarker(
+                    location=(lat, lon),
+                    radius=3,
+                    color="blue",
+                    fill=True,
+                    fill_opacity=0.6,
+                ).add_to(m)
+
+    # Render, and refetch once the user pans/zooms outside the fetched area
+    out = st_folium(
+        m, width="100%", height=600, key="map_viewer",
+        returned_objects=["bounds", "zoom", "center"],
+    ) or {}
+    bounds = bounds_from_folium(out.get("bounds"))
+    if bounds and (not bbox_contains(fetched, bounds) or out.get("zoom") != view["zoom"]):
+        center = out.get("center") or {}
+        view.update(
+            bounds=bounds,
+            zoom=out.get("zoom") or view["zoom"],
+            center=(center.get("lat", view["center"][0]), center.get("lng", view["center"][1])),
+        )
+        st.rerun()
+
 
-    # Center map on Hawaii
-    m = folium.Map(location=[21.3156, -157.8586], zoom_start=9)
-
-    # Add markers
-    for _, row in df.iterrows():
-        folium.CircleMarker(
-            location=(row.latitude, row.longitude),
-            radius=3,
-            color="blue",
-            fill=True,
-            fill_opacity=0.6,
-        ).add_to(m)
-
-    # Render
-    st_folium(m, width="100%", height=600)
\ No newline at end of file
+if __name__ == "__main__":
+    show()
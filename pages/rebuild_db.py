@@ -2,6 +2,7 @@
 
 import os, streamlit as st
 from database_builder import build_database_from_zip
+from run_report import instrumented
 
 st.title("🔄 Rebuild SQLite Database")
 
@@ -11,7 +12,9 @@ db_default  = st.text_input("Output DB path:",   "data/hawaii.db")
 
 if st.button("Rebuild"):
     try:
-        build_database_from_zip(zip_default, db_default)
+        with instrumented("build_database_from_zip", zip=zip_default, db=db_default):
+            # parse in-process: no worker pool forked from the Streamlit server
+            build_database_from_zip(zip_default, db_default, workers=1)
         st.success(f"✓ Database rebuilt at `{db_default}`")
     except Exception as e:
         st.error(f"Rebuild failed: {e}")
@@ -1,10 +1,85 @@
 # File: pages/reproject_coords.py
 
 import os
-import io
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
 import pandas as pd
 import streamlit as st
-from pyproj import Transformer, CRS
+from pyproj import CRS
+
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
+
+from reprojection import (
+    CHUNK_ROWS, DEFAULT_DST_CRS, REQUIRED_COLUMNS,
+    get_transformer, iter_reprojected, read_chunks, write_chunks,
+)
+from upload_sink import stream_to_file
+
+WORK_PREFIX = "reproject_coords-"
+# work dirs of sessions that ended without replacing their upload
+STALE_AFTER = 24 * 3600  # seconds
+
+
+def sweep_stale_dirs():
+    root = tempfile.gettempdir()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(WORK_PREFIX) and os.path.isdir(path):
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_AFTER:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+
+def release_upload():
+    """Delete this session's spooled upload and outputs."""
+    work = st.session_state.pop("reproject_upload", None)
+    st.session_state.pop("reproject_result", None)
+    if work:
+        shutil.rmtree(work["dir"], ignore_errors=True)
+
+
+def load_upload(upload):
+    """
+    Spool the upload into a fresh per-session temp dir and check it once:
+    returns {key, dir, path, columns, rows}. Kept in session_state under the
+    uploader's file_id and size, so reruns neither re-read nor re-hash the
+    bytes; a new upload deletes the previous one's dir.
+    """
+    key = (getattr(upload, "file_id", upload.name), upload.size)
+    work = st.session_state.get("reproject_upload")
+    if work and work["key"] == key and os.path.exists(work["path"]):
+        return work
+    release_upload()
+    sweep_stale_dirs()
+    work_dir = tempfile.mkdtemp(prefix=WORK_PREFIX)
+    try:
+        path = os.path.join(work_dir, "input.csv")
+        stream_to_file(upload, path)
+        columns = list(pd.read_csv(path, dtype=str, nrows=0).columns)
+        rows = sum(len(c) for c in pd.read_csv(path, dtype=str, usecols=[0], chunksize=CHUNK_ROWS))
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    work = {"key": key, "dir": work_dir, "path": path, "columns": columns, "rows": rows}
+    st.session_state["reproject_upload"] = work
+    return work
+
+
+@st.cache_data
+def crs_from_prj(wkt):
+    crs0 = CRS.from_wkt(wkt)
+    epsg0 = crs0.to_epsg()
+    return f"EPSG:{epsg0}" if epsg0 else crs0.to_string()
+
 
 st.set_page_config(page_title="Reproject TMK CSV", layout="centered")
 st.title("🗺️ Reproject TMK Master CSV to WGS84")
@@ -19,33 +94,29 @@ csv_file = st.file_uploader("Upload projected‑coords CSV", type="csv")
 prj_file = st.file_uploader("Upload matching .prj file (optional)", type="prj")
 
 if not csv_file:
+    release_upload()
     st.info("📄 Please upload your `Hawaii_tmk_master.csv` first.")
     st.stop()
 
-# 2️⃣ Read CSV into DataFrame
+# 2️⃣ Read CSV (once per distinct upload)
 try:
-    df = pd.read_csv(csv_file, dtype=str)
+    with st.spinner("Reading upload…"):
+        work = load_upload(csv_file)
 except Exception as e:
     st.error(f"❌ Failed to read CSV: {e}")
     st.stop()
+csv_path, columns, total_rows = work["path"], work["columns"], work["rows"]
 
-required = {"parcel_id","latitude","longitude"}
-if not required.issubset(df.columns):
-    st.error(f"❌ CSV must contain columns {required}. Found: {list(df.columns)}")
+if not REQUIRED_COLUMNS.issubset(columns):
+    st.error(f"❌ CSV must contain columns {REQUIRED_COLUMNS}. Found: {columns}")
     st.stop()
-
-# Convert coords to float
-df["latitude"]  = df["latitude"].astype(float)
-df["longitude"] = df["longitude"].astype(float)
+st.caption(f"{total_rows} rows")
 
 # 3️⃣ Determine source CRS
 src_crs = None
 if prj_file:
     try:
-        wkt = prj_file.read().decode("utf-8")
-        crs0 = CRS.from_wkt(wkt)
-        epsg0 = crs0.to_epsg()
-        src_crs = f"EPSG:{epsg0}" if epsg0 else crs0.to_string()
+        src_crs = crs_from_prj(prj_file.getvalue().decode("utf-8"))
         st.success(f"🔎 Detected source CRS: {src_crs}")
     except Exception as e:
         st.warning(f"⚠️ Could not parse .prj: {e}")
@@ -57,28 +128,33 @@ if not src_crs:
         st.stop()
     src_crs = f"EPSG:{epsg_in.strip()}"
 
-# 4️⃣ Perform reprojection
+# 4️⃣ Perform reprojection, chunk by chunk, into the session's temp dir
+result_key = (work["key"], src_crs)
+out_path = os.path.join(work["dir"], f"wgs84-{hashlib.sha256(src_crs.encode()).hexdigest()[:12]}.csv")
+
 if st.button("🚀 Reproject to WGS84"):
     try:
-        transformer = Transformer.from_crs(src_crs, "EPSG:4326", always_xy=True)
-        lons, lats = transformer.transform(
-            df["longitude"].tolist(),
-            df["latitude"].tolist()
+        get_transformer(src_crs, DEFAULT_DST_CRS)  # cached per CRS pair for the process
+        bar = st.progress(0.0, text="Reprojecting…")
+        # in-process: the Streamlit worker shouldn't fork a pool per click
+        chunks = iter_reprojected(read_chunks(csv_path), src_crs, DEFAULT_DST_CRS, workers=1)
+        write_chunks(
+            chunks, out_path,
+            progress=lambda n: bar.progress(min(n / max(total_rows, 1), 1.0), text=f"{n}/{total_rows} rows"),
         )
-        df["longitude"], df["latitude"] = lons, lats
     except Exception as e:
         st.error(f"❌ Reprojection failed: {e}")
         st.stop()
+    st.session_state["reproject_result"] = result_key
 
-    # 5️⃣ Offer download
-    out_buf = io.StringIO()
-    df.to_csv(out_buf, index=False)
-    out_buf.seek(0)
-
+# 5️⃣ Offer download from the temp file. st.download_button still reads the
+# whole file into memory: the widget takes its data as bytes.
+if st.session_state.get("reproject_result") == result_key and os.path.exists(out_path):
     st.success("✅ Reprojected successfully!")
-    st.download_button(
-        "⬇️ Download WGS84 CSV",
-        out_buf.getvalue(),
-        file_name="Hawaii_tmk_master_wgs84.csv",
-        mime="text/csv"
-    )
+    with open(out_path, "rb") as f:
+        st.download_button(
+            "⬇️ Download WGS84 CSV",
+            f,
+            file_name="Hawaii_tmk_master_wgs84.csv",
+            mime="text/csv"
+        )
@@ -1,30 +1,66 @@
+import os
+import sys
+from contextlib import nullcontext
+
 import streamlit as st
-import pandas as pd
 from streamlit_folium import st_folium
 import folium
 from folium.plugins import HeatMap
 
-def show(cur):
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from map_data import (
+    HAWAII_BOUNDS, HAWAII_CENTER, HAWAII_ZOOM,
+    bbox_contains, bounds_from_folium, expand_bbox, heat_level, suppression_grid_in_bbox,
+)
+from db_access import read_connection
+
+def show(cur=None):
     st.title("Suppression Status Heat Map")
 
-    # Fetch only parcels with a numeric suppression score
-    df = pd.read_sql(
-        "SELECT latitude, longitude, suppression_status AS weight "
-        "FROM parcels WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND suppression_status IS NOT NULL",
-        cur.connection,
-    ).astype({"latitude": float, "longitude": float, "weight": float})
+    view = st.session_state.setdefault("suppression_heatmap_view", {
+        "center": HAWAII_CENTER,
+        "zoom": HAWAII_ZOOM,
+        "bounds": HAWAII_BOUNDS,
+    })
 
-    if df.empty:
+    # Load only the precomputed grid for this zoom level and viewport,
+    # so the payload is bounded by the grid size, not the parcel count
+    fetched = expand_bbox(view["bounds"])
+    with nullcontext(cur.connection) if cur is not None else read_connection() as conn:
+        df = suppression_grid_in_bbox(conn, fetched, view["zoom"])
+
+    if df.empty and view["bounds"] == HAWAII_BOUNDS:
         st.warning("No suppression data available.")
         return
 
-    m = folium.Map(location=[21.3156, -157.8586], zoom_start=9)
+    m = folium.Map(location=list(view["center"]), zoom_start=view["zoom"])
 
     HeatMap(
-        data=df[["latitude", "longitude", "weight"]].values.tolist(),
+        data=df[["latitude", "longitude", "weight_sum"]].to_numpy().tolist(),
         radius=15,
         blur=10,
         max_zoom=12,
     ).add_to(m)
 
-    st_folium(m, width="100%", height=600)
+    # Refetch once the user pans outside the fetched area or changes grid level
+    out = st_folium(
+        m, width="100%", height=600, key="suppression_heatmap",
+        returned_objects=["bounds", "zoom", "center"],
+    ) or {}
+    bounds = bounds_from_folium(out.get("bounds"))
+    zoom = out.get("zoom") or view["zoom"]
+    if bounds and (not bbox_contains(fetched, bounds) or heat_level(zoom) != heat_level(view["zoom"])):
+        center = out.get("center") or {}
+        view.update(
+            bounds=bounds,
+            zoom=zoom,
+            center=(center.get("lat", view["center"][0]), center.get("lng", view["center"][1])),
+        )
+        st.rerun()
+
+
+if __name__ == "__main__":
+    show()
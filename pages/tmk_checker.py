@@ -1,29 +1,86 @@
 import os
-import sqlite3
+import re
+import sys
 
 import pandas as pd
 import streamlit as st
 
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
+
+from db_access import DB_PATH, query_df
+from suppression_store import SUPPRESSION_CSV, get_store
+from tmk_lookup import bulk_lookup
+from tmk_parser import tmk_key
+
+
+def parse_tmk_list(uploaded, pasted):
+    """TMKs from an uploaded CSV (TMK/tmk/parcel_id or first column) and/or pasted text."""
+    tmks = []
+    if uploaded is not None:
+        df_in = pd.read_csv(uploaded, dtype=str, keep_default_na=False)
+        col = next((c for c in ("TMK", "tmk", "parcel_id") if c in df_in.columns), df_in.columns[0])
+        tmks.extend(df_in[col].tolist())
+    if pasted:
+        tmks.extend(re.split(r"[\s,;]+", pasted))
+    return [t.strip() for t in tmks if t and t.strip()]
+
+
+def run_batch():
+    uploaded = st.file_uploader("Upload a CSV of TMKs", type="csv")
+    pasted = st.text_area("…or paste TMKs (one per line, or comma-separated):", "")
+    tmks = parse_tmk_list(uploaded, pasted)
+    if not tmks:
+        st.info("Upload a CSV or paste a list of TMKs above to begin.")
+        return
+
+    try:
+        result = bulk_lookup(tmks)
+    except Exception as e:
+        st.error(f"❌ Batch lookup failed:\n{e}")
+        return
+
+    located = result.dropna(subset=["latitude", "longitude"])
+    st.write(
+        f"**{len(result)}** TMKs • **{int(result['suppression_record'].sum())}** with a "
+        f"suppression record • **{len(located)}** located"
+    )
+    st.dataframe(result, use_container_width=True)
+    st.download_button(
+        "📥 Download results CSV",
+        result.to_csv(index=False).encode("utf-8"),
+        file_name="tmk_check_results.csv",
+        mime="text/csv",
+    )
+    if not located.empty:
+        st.subheader("Located TMKs")
+        st.map(located.rename(columns={"latitude": "lat", "longitude": "lon"})[["lat", "lon"]])
+
 
 def run():
     st.title("🔍 TMK Checker")
 
+    mode = st.radio("Mode", ["Single TMK", "Batch"], horizontal=True)
+    if mode == "Batch":
+        run_batch()
+        return
+
     # ——— 1) get TMK input ——————————————————————————————
     tmk = st.text_input("Enter TMK (e.g. 389014053):", "")
     if not tmk:
         st.info("Type or paste a TMK above to begin.")
         return
 
-    # ——— 2) load suppression status CSV ————————————————
-    supp_csv = os.path.join("data", "Hawaii_tmk_suppression_status.csv")
+    # ——— 2) look up suppression status (indexed, cached across reruns) ——
     try:
-        df_supp = pd.read_csv(supp_csv, dtype={"TMK": str})
+        record = get_store().lookup(tmk)
     except Exception as e:
-        st.error(f"❌ Could not load suppression CSV at `{supp_csv}`:\n{e}")
+        st.error(f"❌ Could not load suppression CSV at `{SUPPRESSION_CSV}`:\n{e}")
         return
 
-    # filter for this TMK
-    record = df_supp[df_supp["TMK"] == tmk]
     if record.empty:
         st.warning(f"No suppression record found for TMK **{tmk}**.")
     else:
@@ -31,23 +88,22 @@ def run():
         st.table(record)
 
     # ——— 3) look up coordinates in SQLite DB ————————————
-    db_path = os.path.join("data", "hawaii.db")
-    if not os.path.exists(db_path):
+    if not os.path.exists(DB_PATH):
         st.info("ℹ️ Database not found at `data/hawaii.db`.")
         return
 
+    # match on the canonical TMK key, so "TMK 3-8-9-014:053" finds 389014053
+    key = tmk_key(tmk)
+    column, param = ("tmk_key", key) if key is not None else ("parcel_id", tmk.strip())
     try:
-        conn = sqlite3.connect(db_path)
-        coords = pd.read_sql_query(
-            "SELECT latitude, longitude FROM parcels WHERE parcel_id = ?",
-            conn,
-            params=(tmk,),
+        coords = query_df(
+            f"SELECT latitude, longitude FROM parcels "
+            f"WHERE {column} = ? AND latitude IS NOT NULL LIMIT 1",
+            (param,),
         )
     except Exception as e:
         st.error(f"❌ Error querying database:\n{e}")
         return
-    finally:
-        conn.close()
 
     if coords.empty:
         st.info("No coordinate found in the DB for this TMK.")
@@ -59,3 +115,7 @@ def run():
 
         # show a simple map
         st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}))
+
+
+if __name__ == "__main__":
+    run()
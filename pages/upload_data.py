@@ -2,6 +2,16 @@
 
 import streamlit as st
 import os
+import sys
+
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
+
+from evidence_store import save_evidence
+from upload_sink import save_upload
 
 st.title("📂 Upload CSV & YAML Data")
 
@@ -30,8 +40,6 @@ if uploaded:
             st.warning(f"Skipping unsupported file type: {up.name}")
             continue
 
-        os.makedirs(folder, exist_ok=True)
-        save_path = os.path.join(folder, up.name)
-        with open(save_path, "wb") as f:
-            f.write(up.getbuffer())
-        st.success(f"✔️  Saved `{up.name}` → `{folder}/`")
+        # YAMLs go through the content-addressed evidence store
+        rec = save_evidence(up) if folder == "evidence" else save_upload(up, folder)
+        st.success(f"✔️  Saved `{rec.name}` → `{folder}/` ({rec.size:,} bytes, sha256 `{rec.sha256[:12]}`)")
@@ -1,11 +1,16 @@
 # pages/upload_to_root.py
 
 import os
+import sys
 import streamlit as st
 
 # Compute your project root (two levels up from this file)
 PAGE_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.abspath(os.path.join(PAGE_DIR, os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from upload_sink import safe_name, save_upload
 
 st.title("📤 Upload Files to Project Root")
 st.markdown(
@@ -24,16 +29,15 @@ uploaded_files = st.file_uploader(
 
 if uploaded_files:
     for uploaded_file in uploaded_files:
-        dest_path = os.path.join(ROOT_DIR, uploaded_file.name)
+        dest_path = os.path.join(ROOT_DIR, safe_name(uploaded_file.name))
         # avoid overwriting unless you really want to
         if os.path.exists(dest_path):
             if not st.confirm(f"`{uploaded_file.name}` already exists—overwrite?"):
                 st.info(f"Skipped `{uploaded_file.name}`.")
                 continue
 
-        # write it out
-        with open(dest_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        st.success(f"✔️ Saved `{uploaded_file.name}` to `{dest_path}`")
+        # stream it out (chunked, hashed, atomically renamed into place)
+        rec = save_upload(uploaded_file, ROOT_DIR)
+        st.success(f"✔️ Saved `{rec.name}` to `{rec.path}` (sha256 `{rec.sha256[:12]}`)")
 
     st.info("Once uploaded, switch back to your main page to rebuild your DB or re-run your scripts.")
@@ -0,0 +1,356 @@
+# rebuild_jobs.py
+"""
+Background DB rebuild jobs for pages/admin_uploader.py.
+
+submit() records a job in data/jobs.db and starts a detached worker process
+(`python rebuild_jobs.py run <id>`) that runs scripts/rebuild_db_from_yaml.py's
+build_db() and writes its stage and counts (files parsed, rows inserted)
+back to the job row as it goes. The state lives in SQLite, not in the
+Streamlit session, so any session (or a reloaded page) can poll it.
+
+Only one rebuild runs at a time: submit() hands back the active job instead
+of starting a second one, and the worker holds an exclusive flock on
+data/rebuild.lock for the whole build as a backstop.
+
+cancel() sends SIGTERM to the worker's process group; the build unwinds
+through its normal error paths (a staged full build deletes its staging
+file, an incremental update rolls back), so the live DB is left as it was.
+retry() submits a new job of the same kind, linked to the old one.
+
+    python rebuild_jobs.py submit --full      # start (or join) a rebuild
+    python rebuild_jobs.py status             # recent jobs
+    python rebuild_jobs.py cancel 12
+"""
+import os
+import sys
+import time
+import fcntl
+import signal
+import sqlite3
+import argparse
+import subprocess
+
+from db_access import DB_PATH
+from run_report import instrumented
+
+ROOT = os.path.abspath(os.path.dirname(__file__))
+
+JOBS_DB = os.path.join("data", "jobs.db")
+LOCK_PATH = os.path.join("data", "rebuild.lock")
+LOG_DIR = os.path.join("data", "job_logs")
+
+# seconds between progress writes from the worker (stage changes always write)
+PROGRESS_INTERVAL = 0.5
+
+# how long a queued job may go without a worker pid before it counts as dead
+# (submit() commits the row, then spawns the worker, then records its pid)
+SPAWN_GRACE = 60.0
+
+KINDS = ("incremental", "full")
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE = (QUEUED, RUNNING, CANCELLING)
+
+JOBS_TABLE = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id             INTEGER PRIMARY KEY,
+        kind           TEXT NOT NULL,
+        status         TEXT NOT NULL,
+        stage          TEXT,
+        files_total    INTEGER,
+        files_done     INTEGER NOT NULL DEFAULT 0,
+        rows_inserted  INTEGER NOT NULL DEFAULT 0,
+        message        TEXT,
+        pid            INTEGER,
+        log_path       TEXT,
+        retry_of       INTEGER REFERENCES jobs(id),
+        created_at     REAL NOT NULL,
+        started_at     REAL,
+        finished_at    REAL,
+        updated_at     REAL NOT NULL
+    )
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def connect(path=JOBS_DB):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # autocommit: every write is its own short transaction unless BEGIN'd
+    conn = sqlite3.connect(path, timeout=10.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(JOBS_TABLE)
+    return conn
+
+
+def _update(conn, job_id, **fields):
+    fields["updated_at"] = time.time()
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        # reap our own exited child, or it lingers as a zombie that os.kill sees
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _reap(conn):
+    """Close out active jobs whose worker died without recording a result."""
+    for job in conn.execute(
+        f"SELECT id, status, pid, created_at FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE))})",
+        ACTIVE,
+    ).fetchall():
+        if not job["pid"] and job["status"] == QUEUED and time.time() - job["created_at"] < SPAWN_GRACE:
+            continue  # submit() is still starting its worker
+        if not _pid_alive(job["pid"]):
+            if job["status"] == CANCELLING:
+                _update(conn, job["id"], status=CANCELLED, finished_at=time.time())
+            else:
+                _update(conn, job["id"], status=FAILED, finished_at=time.time(),
+                        message="worker exited unexpectedly")
+
+
+def get_job(job_id, conn=None):
+    conn = conn or connect()
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def list_jobs(limit=20, conn=None):
+    conn = conn or connect()
+    return [dict(r) for r in conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))]
+
+
+def active_job(conn=None):
+    """The queued/running/cancelling job, if any (dead workers are reaped first)."""
+    conn = conn or connect()
+    _reap(conn)
+    row = conn.execute(
+        f"SELECT * FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE))}) ORDER BY id LIMIT 1",
+        ACTIVE,
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def elapsed(job, now=None):
+    """Seconds the job has run (so far, if still running)."""
+    if not job.get("started_at"):
+        return 0.0
+    return (job.get("finished_at") or now or time.time()) - job["started_at"]
+
+
+def submit(kind="incremental", retry_of=None):
+    """
+    Start a rebuild of `kind` in a background worker and return its job id,
+    or the id of the rebuild that is already active (single-flight).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {KINDS}, got {kind!r}")
+    conn = connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")  # serializes concurrent submits
+        try:
+            active = active_job(conn)
+            if active:
+                conn.execute("COMMIT")
+                return active["id"]
+            now = time.time()
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, status, retry_of, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, QUEUED, retry_of, now, now),
+            ).lastrowid
+            log_path = os.path.join(LOG_DIR, f"{job_id}.log")
+            _update(conn, job_id, log_path=log_path)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        # the row is committed before the worker starts, so its get_job() finds it
+        try:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            with open(log_path, "ab") as log:
+                proc = subprocess.Popen(
+                    [sys.executable, os.path.join(ROOT, "rebuild_jobs.py"), "run", str(job_id)],
+                    cwd=os.getcwd(), stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                    start_new_session=True,  # own process group: cancel() signals the pool too
+                )
+        except BaseException as e:
+            _update(conn, job_id, status=FAILED, finished_at=time.time(),
+                    message=f"could not start worker: {e}")
+            raise
+        conn.execute(
+            "UPDATE jobs SET pid = ?, updated_at = ? WHERE id = ? AND pid IS NULL",
+            (proc.pid, time.time(), job_id),
+        )
+        return job_id
+    finally:
+        conn.close()
+
+
+def cancel(job_id):
+    """Ask an active job to stop. Returns False if it had already finished."""
+    conn = connect()
+    try:
+        job = get_job(job_id, conn)
+        if not job or job["status"] not in ACTIVE:
+            return False
+        _update(conn, job_id, status=CANCELLING)
+        if job["pid"]:
+            try:
+                os.killpg(job["pid"], signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        return True
+    finally:
+        conn.close()
+
+
+def retry(job_id):
+    """Submit a new job of the same kind as `job_id` (single-flight applies)."""
+    job = get_job(job_id)
+    if not job:
+        raise ValueError(f"No job {job_id}")
+    return submit(job["kind"], retry_of=job_id)
+
+
+def read_log(job, max_bytes=20000):
+    """The tail of a job's worker log."""
+    path = job.get("log_path")
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        f.seek(max(0, os.path.getsize(path) - max_bytes))
+        return f.read().decode("utf-8", "replace")
+
+
+class ProgressWriter:
+    """build_db progress callback that persists to the job row, throttled."""
+
+    def __init__(self, conn, job_id):
+        self.conn = conn
+        self.job_id = job_id
+        self.stage = None
+        self.counts = {}
+        self.last = 0.0
+
+    def __call__(self, stage, **counts):
+        # counts carry over, so a stage change also writes the last throttled ones
+        self.counts.update(counts)
+        now = time.monotonic()
+        if stage == self.stage and "files_total" not in counts and now - self.last < PROGRESS_INTERVAL:
+            return
+        if stage != self.stage:
+            print(f"ℹ️ Stage: {stage}", flush=True)
+        self.stage, self.last = stage, now
+        _update(self.conn, self.job_id, stage=stage, **self.counts)
+
+
+def run_job(job_id):
+    """Worker entry point: run one job's build and record how it ended."""
+    conn = connect()
+    job = get_job(job_id, conn)
+    if not job or job["status"] not in ACTIVE:
+        return
+    if job["status"] == CANCELLING:
+        _update(conn, job_id, status=CANCELLED, finished_at=time.time())
+        return
+
+    lock = open(LOCK_PATH, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        _update(conn, job_id, status=FAILED, finished_at=time.time(),
+                message="another rebuild holds the lock")
+        return
+
+    main_pid = os.getpid()
+
+    def on_sigterm(signum, frame):
+        if os.getpid() != main_pid:
+            os._exit(1)  # a parser pool child: the pool is torn down by the main process
+        raise JobCancelled()
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+    _update(conn, job_id, status=RUNNING, pid=main_pid, started_at=time.time())
+    try:
+        sys.path.insert(0, os.path.join(ROOT, "scripts"))
+        import rebuild_db_from_yaml
+
+        rebuild_db_from_yaml.DB_PATH = DB_PATH
+        with instrumented(
+            "rebuild_db_from_yaml", cancel_exceptions=(JobCancelled,),
+            job_id=job_id, incremental=job["kind"] == "incremental",
+        ):
+            inserted = rebuild_db_from_yaml.build_db(
+                incremental=job["kind"] == "incremental",
+                progress=ProgressWriter(conn, job_id),
+            )
+    except JobCancelled:
+        print("⚠️ Cancelled.", flush=True)
+        _update(conn, job_id, status=CANCELLED, finished_at=time.time())
+    except BaseException as e:
+        print(f"❌ Rebuild failed: {e!r}", flush=True)
+        _update(conn, job_id, status=FAILED, finished_at=time.time(), message=str(e) or repr(e))
+        if not isinstance(e, Exception):
+            raise
+    else:
+        _update(conn, job_id, status=SUCCEEDED, stage="done", rows_inserted=inserted,
+                finished_at=time.time(), message=None)
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background DB rebuild jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("submit", help="start a rebuild (or join the active one)")
+    p.add_argument("--full", action="store_true", help="full rebuild instead of incremental")
+    sub.add_parser("status", help="list recent jobs")
+    for name in ("run", "cancel", "retry"):
+        sub.add_parser(name).add_argument("job_id", type=int)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_job(args.job_id)
+    elif args.command == "submit":
+        print(submit("full" if args.full else "incremental"))
+    elif args.command == "cancel":
+        print("✅ Cancelling." if cancel(args.job_id) else "ℹ️ Job is not active.")
+    elif args.command == "retry":
+        print(retry(args.job_id))
+    else:
+        active_job()  # reap dead workers first
+        for job in list_jobs():
+            print(f"{job['id']:>5}  {job['kind']:<11} {job['status']:<10} {job['stage'] or '':<18} "
+                  f"{job['files_done']}/{job['files_total'] or '?'} files  "
+                  f"{job['rows_inserted']} rows  {elapsed(job):.1f}s  {job['message'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# reprojection.py
+"""
+Chunked reprojection of parcel_id/latitude/longitude CSVs.
+
+The CSV is read in CHUNK_ROWS-row chunks; each chunk's coordinate columns
+are converted to float64 arrays and transformed in place by a pyproj
+Transformer that is built once per process (get_transformer is cached), so
+pool workers keep theirs across chunks. reproject_csv() keeps at most a
+few chunks in flight per worker and appends each result to the output as
+soon as it is ready, in input order, so memory stays bounded by the chunk
+size rather than the file size.
+
+As in the original script, "longitude" holds the projected x and
+"latitude" the projected y on input.
+"""
+import os
+import functools
+import collections
+import multiprocessing
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+
+from evidence_parser import default_workers
+from run_report import count, span
+
+DEFAULT_SRC_CRS = "EPSG:3564"
+DEFAULT_DST_CRS = "EPSG:4326"
+CHUNK_ROWS = 100_000
+REQUIRED_COLUMNS = {"parcel_id", "latitude", "longitude"}
+
+# chunks queued per worker: enough to keep it busy while the parent writes
+IN_FLIGHT_PER_WORKER = 2
+
+
+def normalize_crs(crs):
+    """Accept "3564" as shorthand for "EPSG:3564"."""
+    crs = str(crs).strip()
+    return f"EPSG:{crs}" if crs.isdigit() else crs
+
+
+@functools.lru_cache(maxsize=8)
+def get_transformer(src_crs, dst_crs=DEFAULT_DST_CRS):
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
+def reproject_chunk(df, src_crs, dst_crs=DEFAULT_DST_CRS):
+    """Reproject one DataFrame chunk's longitude/latitude columns in place."""
+    x = df["longitude"].to_numpy(dtype=np.float64, copy=True)
+    y = df["latitude"].to_numpy(dtype=np.float64, copy=True)
+    get_transformer(src_crs, dst_crs).transform(x, y, inplace=True)
+    df["longitude"] = x
+    df["latitude"] = y
+    return df
+
+
+def _reproject_task(args):
+    return reproject_chunk(*args)
+
+
+def read_chunks(source, chunksize=CHUNK_ROWS):
+    """
+    Iterate over a CSV (path or file object) in chunks, checking the
+    columns on the first one. Raises ValueError if they're missing.
+    """
+    first = True
+    reader = iter(pd.read_csv(source, dtype=str, chunksize=chunksize))
+    while True:
+        with span("csv read"):
+            chunk = next(reader, None)
+        if chunk is None:
+            return
+        if first and not REQUIRED_COLUMNS.issubset(chunk.columns):
+            raise ValueError(
+                f"CSV must contain columns {REQUIRED_COLUMNS}; found {list(chunk.columns)}"
+            )
+        first = False
+        yield chunk
+
+
+def iter_reprojected(chunks, src_crs, dst_crs=DEFAULT_DST_CRS, workers=None):
+    """
+    Yield each chunk reprojected, in order. With more than one worker the
+    chunks fan out to a process pool, with a bounded number in flight.
+    """
+    if workers is None:
+        workers = default_workers()
+    if workers <= 1:
+        for chunk in chunks:
+            with span("transform"):
+                chunk = reproject_chunk(chunk, src_crs, dst_crs)
+            yield chunk
+        return
+
+    def result(task):
+        # the pool transforms; this is the time spent waiting on it
+        with span("transform (wait)"):
+            return task.get()
+
+    pending = collections.deque()
+    with multiprocessing.Pool(workers) as pool:
+        for chunk in chunks:
+            pending.append(pool.apply_async(_reproject_task, ((chunk, src_crs, dst_crs),)))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                yield result(pending.popleft())
+        while pending:
+            yield result(pending.popleft())
+
+
+def write_chunks(chunks, out_path, progress=None):
+    """
+    Append chunks to out_path as they arrive (header once), via a temp file
+    renamed into place at the end. progress(rows_so_far) is called after
+    every chunk. Returns the number of rows written.
+    """
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    tmp = out_path + ".tmp"
+    rows = 0
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            for chunk in chunks:
+                with span("write"):
+                    chunk.to_csv(f, index=False, header=rows == 0)
+                rows += len(chunk)
+                count("rows", len(chunk))
+                if progress is not None:
+                    progress(rows)
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
+
+
+def reproject_csv(in_path, out_path, src_crs=DEFAULT_SRC_CRS, dst_crs=DEFAULT_DST_CRS,
+                  chunksize=CHUNK_ROWS, workers=None, progress=None):
+    """Stream-reproject in_path → out_path. Returns the number of rows written."""
+    src_crs, dst_crs = normalize_crs(src_crs), normalize_crs(dst_crs)
+    get_transformer(src_crs, dst_crs)  # fail on a bad CRS before starting the pool
+    count("files")
+    count("bytes", os.path.getsize(in_path))
+    chunks = iter_reprojected(read_chunks(in_path, chunksize), src_crs, dst_crs, workers)
+    return write_chunks(chunks, out_path, progress)
@@ -0,0 +1,174 @@
+# run_report.py
+"""
+Stage timings and counters for the builders and reprojection.
+
+A CLI (or rebuild job) wraps a run in instrumented(); code along the way
+marks its stages with span() and tallies with count(). Both are no-ops
+when no run is being recorded, so library callers pay nothing:
+
+    with instrumented("rebuild_db_from_yaml", kind="full", profile=args.profile):
+        build_db()
+
+    # deep inside the builder
+    with span("insert"):
+        conn.executemany(...)
+    count("rows", len(rows))
+
+A span that is entered many times (one per batch) accumulates its total
+seconds and a call count. On exit the run is written as JSON to
+data/run_reports/: total and per-stage seconds, counters, peak RSS of
+the process and of its (pool) children, and the error if it failed. With
+profile=True a cProfile dump of the run is written next to it (.prof).
+Only the newest KEEP_REPORTS reports are kept.
+
+The recorded run is per thread: Streamlit sessions don't mix spans.
+"""
+import os
+import sys
+import json
+import time
+import cProfile
+import resource
+import threading
+from contextlib import contextmanager
+
+REPORT_DIR = os.path.join("data", "run_reports")
+KEEP_REPORTS = 200
+
+_local = threading.local()
+
+
+def _peak_rss_mb(who):
+    rss = resource.getrusage(who).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class RunReport:
+    """Timings and counters of one run; see instrumented()."""
+
+    def __init__(self, name, **meta):
+        self.name = name
+        self.meta = meta
+        self.stages = {}
+        self.counters = {}
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            s = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+            s["seconds"] += time.perf_counter() - t0
+            s["calls"] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self, status="ok", error=None):
+        return {
+            "name": self.name,
+            "status": status,
+            "error": error,
+            "started_at": self.started,
+            "seconds": time.perf_counter() - self._t0,
+            "stages": {k: {**v, "seconds": round(v["seconds"], 6)} for k, v in self.stages.items()},
+            "counters": self.counters,
+            "peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+            "children_peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            "pid": os.getpid(),
+            "meta": self.meta,
+        }
+
+
+def current():
+    """The run being recorded on this thread, or None."""
+    return getattr(_local, "report", None)
+
+
+@contextmanager
+def span(stage):
+    report = current()
+    if report is None:
+        yield
+    else:
+        with report.span(stage):
+            yield
+
+
+def count(name, n=1):
+    report = current()
+    if report is not None:
+        report.count(name, n)
+
+
+def _prune(report_dir, keep):
+    reports = sorted(f for f in os.listdir(report_dir) if f.endswith(".json"))
+    for fname in reports[:-keep]:
+        for path in (fname, fname[:-len(".json")] + ".prof"):
+            if os.path.exists(os.path.join(report_dir, path)):
+                os.remove(os.path.join(report_dir, path))
+
+
+def write_report(data, report_dir=REPORT_DIR, profiler=None):
+    """Write a finished run's dict (and profile); returns the JSON path."""
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(data["started_at"]))
+    base = os.path.join(report_dir, f"{stamp}-{data['pid']}-{data['name']}")
+    if profiler is not None:
+        profiler.dump_stats(base + ".prof")
+        data["profile"] = base + ".prof"
+    with open(base + ".json.tmp", "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(base + ".json.tmp", base + ".json")
+    _prune(report_dir, KEEP_REPORTS)
+    return base + ".json"
+
+
+@contextmanager
+def instrumented(name, profile=False, report_dir=REPORT_DIR,
+                 cancel_exceptions=(KeyboardInterrupt,), **meta):
+    """
+    Record the body as one run and write its report on exit, failed runs
+    included (an exception in cancel_exceptions marks it "cancelled").
+    Nested inside another recorded run it just joins that one.
+    """
+    if current() is not None:
+        yield current()
+        return
+    report = _local.report = RunReport(name, **meta)
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+    status, error = "ok", None
+    try:
+        yield report
+    except BaseException as e:
+        status, error = ("cancelled" if isinstance(e, cancel_exceptions) else "failed"), repr(e)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        _local.report = None
+        try:
+            path = write_report(report.to_dict(status, error), report_dir, profiler)
+            print(f"ℹ️ Run report → {path}")
+        except OSError as e:
+            print(f"⚠️ Could not write run report: {e}")
+
+
+def load_reports(limit=20, report_dir=REPORT_DIR):
+    """The newest `limit` run reports, newest first."""
+    if not os.path.isdir(report_dir):
+        return []
+    reports = []
+    for fname in sorted((f for f in os.listdir(report_dir) if f.endswith(".json")), reverse=True)[:limit]:
+        try:
+            with open(os.path.join(report_dir, fname)) as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return reports
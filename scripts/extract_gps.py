@@ -3,40 +3,182 @@
 scripts/extract_gps.py
 
 1) Pull every `gps: [lat,lon]` from your evidence/*.yaml
-2) Dump data/gps_patch.csv  (all parcels with YAML‑provided coords)
+2) Merge them into data/gps_patch.csv  (all parcels with YAML‑provided coords)
 3) Compare against data/Hawaii_tmk_master.csv to find which still lack coords
    → data/missing_gps.csv
+
+Only YAMLs added or changed since the last run (by size/mtime, recorded in
+data/gps_patch.csv.manifest.json) are parsed, in parallel. Patch rows from
+unchanged YAMLs, and rows from other sources, are carried over as they are;
+rows from changed or deleted YAMLs are replaced or dropped.
+
+The patch has one YAML row per parcel_id: the one from the first YAML in
+filename order, as a full run reads them. The manifest also counts each
+YAML's rows that lost to another file's, so when a YAML changes or goes
+away the ones that lost rows to it are parsed again too.
 """
+import os
+import sys
+import csv
+import json
 import glob
-import yaml
+import argparse
+import numpy as np
 import pandas as pd
 
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
+
+from evidence_parser import load_yaml_file, parse_files
+from tmk_parser import MISSING_KEY, tmk_keys
+
+EVIDENCE_GLOB = "evidence/*.yaml"
+MASTER_CSV = "data/Hawaii_tmk_master.csv"
+PATCH_CSV = "data/gps_patch.csv"
+MISSING_CSV = "data/missing_gps.csv"
+MANIFEST = PATCH_CSV + ".manifest.json"
+
+PATCH_COLUMNS = ["certificate_id", "parcel_id", "filename", "latitude", "longitude", "source"]
+# `source` of the rows this script owns; anything else in the patch is left alone
+SOURCE = "yaml"
+
+def gps_rows(path):
+    """
+    Worker: (path, patch rows, error). One row per parcel with inline GPS
+    in the file, in PATCH_COLUMNS order.
+    """
+    try:
+        doc = load_yaml_file(path) or {}
+    except Exception as e:
+        return path, [], str(e)
+    if not isinstance(doc, dict):
+        return path, [], "not a YAML mapping"
+    txns = doc.get("transactions") or []
+    if not isinstance(txns, list):
+        return path, [], "transactions is not a list"
+
+    rows, seen = [], set()
+    cert = doc.get("certificate_number")
+    fname = os.path.basename(path)
+    for txn in txns:
+        if not isinstance(txn, dict):
+            continue
+        gps, pid = txn.get("gps"), txn.get("parcel_id")
+        if not gps or pid is None or str(pid) in seen:
+            continue
+        try:
+            lat, lon = float(gps[0]), float(gps[1])
+        except (TypeError, ValueError, IndexError):
+            continue
+        seen.add(str(pid))
+        rows.append((cert, str(pid), fname, lat, lon, SOURCE))
+    return path, rows, None
+
+def load_manifest():
+    # without the patch file the manifest is meaningless: start over
+    if not os.path.exists(PATCH_CSV) or not os.path.exists(MANIFEST):
+        return {}
+    with open(MANIFEST, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    with open(MANIFEST + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(MANIFEST + ".tmp", MANIFEST)
+
+def load_kept_rows(unchanged):
+    """Existing patch rows to carry over: other sources, and unchanged YAMLs."""
+    if not os.path.exists(PATCH_CSV):
+        return pd.DataFrame(columns=PATCH_COLUMNS)
+    patch = pd.read_csv(PATCH_CSV, dtype=str, keep_default_na=False)
+    if not set(PATCH_COLUMNS).issubset(patch.columns):
+        # pre-manifest patch (parcel_id,latitude,longitude): all YAML-derived
+        return pd.DataFrame(columns=PATCH_COLUMNS)
+    keep = (patch["source"] != SOURCE) | patch["filename"].isin(unchanged)
+    return patch.loc[keep, PATCH_COLUMNS]
+
+def missing_parcels(master_ids, patch_ids):
+    """
+    Anti-join: master parcel ids with no patch row, on sorted TMK keys
+    (searchsorted); ids that aren't TMKs fall back to exact text.
+    """
+    master_keys = tmk_keys(master_ids)
+    patch_keys = np.unique(tmk_keys(patch_ids))
+    patch_keys = patch_keys[patch_keys != MISSING_KEY]
+
+    found = np.zeros(len(master_keys), dtype=bool)
+    if len(patch_keys):
+        idx = np.searchsorted(patch_keys, master_keys)
+        idx[idx == len(patch_keys)] = 0
+        found = patch_keys[idx] == master_keys
+    text = master_keys == MISSING_KEY
+    if text.any():
+        found[text] = pd.Series(master_ids)[text].isin(set(patch_ids)).to_numpy()
+    return ~found
+
 def main():
-    # 1) Read your master TMK list (with x/y that you reprojected to WGS84 already)
-    master = pd.read_csv("data/Hawaii_tmk_master.csv", dtype={"parcel_id": str})
-
-    # 2) Scan all YAMLs for gps fields
-    records = []
-    for fn in glob.glob("evidence/*.yaml"):
-        doc = yaml.safe_load(open(fn, encoding="utf-8"))
-        for txn in doc.get("transactions", []):
-            gps = txn.get("gps")
-            if gps:
-                records.append({
-                    "parcel_id": str(txn["parcel_id"]),
-                    "latitude":  gps[0],
-                    "longitude": gps[1],
-                })
-
-    patch = pd.DataFrame(records).drop_duplicates(subset=["parcel_id"])
-    patch.to_csv("data/gps_patch.csv", index=False)
-    print(f"Wrote {len(patch)} patched coords → data/gps_patch.csv")
+    parser = argparse.ArgumentParser(description="Merge YAML GPS into gps_patch.csv.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parser processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    # 1) Which YAMLs changed since the last run? Manifest entries are
+    #    [size, mtime_ns, rows lost to another YAML's row for the same parcel]
+    manifest = load_manifest()
+    current = {}
+    for path in sorted(glob.glob(EVIDENCE_GLOB)):
+        st = os.stat(path)
+        current[path] = [st.st_size, st.st_mtime_ns]
+    changed = [p for p, sig in current.items() if manifest.get(p, [])[:2] != sig]
+    removed = set(manifest) - set(current)
+    if changed or removed:
+        # their rows may have beaten rows of unchanged YAMLs: parse those again too
+        changed = sorted(set(changed) | {p for p in current if manifest.get(p, [0, 0, 0])[2]})
+    unchanged = {os.path.basename(p) for p in current if p not in changed}
+    print(f"ℹ️ {len(changed)} new/changed of {len(current)} YAMLs ({len(removed)} removed)")
+
+    # 2) Merge the carried-over rows with freshly parsed GPS, one YAML row
+    #    per parcel (the lowest filename wins), then write the patch
+    kept = load_kept_rows(unchanged)
+    other = kept[kept["source"] != SOURCE]
+    owner = {}
+    for row in kept[kept["source"] == SOURCE].itertuples(index=False):
+        owner[row.parcel_id] = tuple(row)
+    lost = {p: 0 for p in current}
+    for path, rows, error in parse_files(changed, gps_rows, workers=args.workers):
+        if error:
+            print(f"⚠️ Skipping {path}: {error}")
+        for row in rows:
+            prev = owner.get(row[1])
+            if prev is not None and prev[2] <= row[2]:
+                lost[path] += 1
+                continue
+            if prev is not None:
+                lost[os.path.join(os.path.dirname(path), prev[2])] += 1
+            owner[row[1]] = row
+    for path in current:
+        if path not in changed:
+            lost[path] += manifest[path][2]
+
+    tmp = PATCH_CSV + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        other.to_csv(f, index=False)
+        csv.writer(f).writerows(owner.values())
+    os.replace(tmp, PATCH_CSV)
+    patch_ids = other["parcel_id"].tolist() + list(owner)
+    added = sum(1 for row in owner.values() if row[2] not in unchanged)
+    print(f"Wrote {len(patch_ids)} patched coords ({added} new) → {PATCH_CSV}")
 
     # 3) Any master parcels still missing?
-    merged = master.merge(patch, on="parcel_id", how="left")
-    missing = merged[merged["latitude"].isna()][["parcel_id"]]
-    missing.to_csv("data/missing_gps.csv", index=False)
-    print(f"Wrote {len(missing)} missing coords → data/missing_gps.csv")
+    master = pd.read_csv(MASTER_CSV, dtype=str, usecols=["parcel_id"])
+    missing = master[missing_parcels(master["parcel_id"].tolist(), patch_ids)]
+    missing.to_csv(MISSING_CSV, index=False)
+    print(f"Wrote {len(missing)} missing coords → {MISSING_CSV}")
+
+    save_manifest({p: sig + [lost[p]] for p, sig in current.items()})
 
 if __name__ == "__main__":
     main()
@@ -1,66 +1,115 @@
 import os
+import sys
 import sqlite3
-import yaml
 
-def build_db(yaml_dir: str, output_path: str = "data/hawaii.db"):
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
 
-    conn = sqlite3.connect(output_path)
-    c = conn.cursor()
+from evidence_parser import load_yaml_file, parse_files
+from bulk_loader import BATCH_SIZE, bulk_load
+from db_access import enable_wal, staged_build
+from run_report import count, span
+from value_parser import parse_amount, parse_date
 
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS parcels (
-            certificate_id TEXT,
-            parcel_id TEXT,
-            parcel_valid BOOLEAN,
-            grantor TEXT,
-            grantee TEXT,
-            amount TEXT,
-            registry_key TEXT,
-            escrow_id TEXT,
-            transfer_bank TEXT,
-            country TEXT,
-            date_signed TEXT,
-            link TEXT,
-            status TEXT
-        )
-    """)
+def parse_yaml_rows(path):
+    """Parser-worker side of build_db: one YAML file → list of parcels rows."""
+    data = load_yaml_file(path)
 
-    count = 0
-    yaml_files = [fname for fname in os.listdir(yaml_dir) if fname.endswith(".yaml")]
-    
-    if not yaml_files:
-        raise Exception("No YAML files found in directory.")
+    if not data or "transactions" not in data:
+        return []  # Skip empty or invalid YAML files
 
-    for fname in yaml_files:
-        path = os.path.join(yaml_dir, fname)
-        with open(path, "r") as f:
-            data = yaml.safe_load(f)
+    cert_id = os.path.splitext(os.path.basename(path))[0]
 
-            if not data or "transactions" not in data:
-                continue  # Skip empty or invalid YAML files
+    rows = []
+    for tx in data.get("transactions", []):
+        rows.append((
+            cert_id,
+            tx.get("parcel_id"),
+            tx.get("parcel_valid", False),
+            tx.get("grantor"),
+            tx.get("grantee"),
+            tx.get("amount"),
+            tx.get("registry_key"),
+            tx.get("escrow_id"),
+            tx.get("transfer_bank"),
+            tx.get("country"),
+            tx.get("date_signed"),
+            tx.get("link"),
+            "Disappeared" if not tx.get("parcel_valid", False) else "Public",
+            # parsed once here, so queries range-scan instead of re-parsing text
+            *parse_amount(tx.get("amount")),
+            parse_date(tx.get("date_signed")),
+        ))
+    return rows
 
-            cert_id = os.path.splitext(fname)[0]
+def build_db(yaml_dir: str, output_path: str = "data/hawaii.db", workers=None):
+    """
+    Rebuild the flat `parcels` DB at output_path from the YAMLs in yaml_dir.
+    Built off to the side (staged_build) and swapped in, so each run replaces
+    the table instead of appending to it and a crash never touches the live DB.
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-            for tx in data.get("transactions", []):
-                row = (
-                    cert_id,
-                    tx.get("parcel_id"),
-                    tx.get("parcel_valid", False),
-                    tx.get("grantor"),
-                    tx.get("grantee"),
-                    tx.get("amount"),
-                    tx.get("registry_key"),
-                    tx.get("escrow_id"),
-                    tx.get("transfer_bank"),
-                    tx.get("country"),
-                    tx.get("date_signed"),
-                    tx.get("link"),
-                    "Disappeared" if not tx.get("parcel_valid", False) else "Public"
-                )
-                c.execute("INSERT INTO parcels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
-                count += 1
+    with span("scan"):
+        yaml_files = [fname for fname in os.listdir(yaml_dir) if fname.endswith(".yaml")]
 
-    conn.commit()
-    conn.close()
-    return count
+        if not yaml_files:
+            raise Exception("No YAML files found in directory.")
+
+        paths = [os.path.join(yaml_dir, fname) for fname in yaml_files]
+        count("files", len(paths))
+        count("bytes", sum(os.path.getsize(p) for p in paths))
+    with staged_build(output_path) as stage:
+        conn = sqlite3.connect(stage.path)
+        try:
+            conn.execute("""
+                CREATE TABLE parcels (
+                    certificate_id TEXT,
+                    parcel_id TEXT,
+                    parcel_valid BOOLEAN,
+                    grantor TEXT,
+                    grantee TEXT,
+                    amount TEXT,
+                    registry_key TEXT,
+                    escrow_id TEXT,
+                    transfer_bank TEXT,
+                    country TEXT,
+                    date_signed TEXT,
+                    link TEXT,
+                    status TEXT,
+                    amount_cents INTEGER,
+                    currency TEXT,
+                    signing_epoch INTEGER
+                )
+            """)
+            # the staging file is thrown away on failure, so the journal can be off
+            with bulk_load(conn, journal_mode="OFF"):
+                sql = "INSERT INTO parcels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                parsed = iter(parse_files(paths, parse_yaml_rows, workers))
+                pending, inserted = [], 0
+                while True:
+                    # time spent waiting on the parser pool
+                    with span("yaml parse"):
+                        rows = next(parsed, None)
+                    if rows is None or len(pending) >= BATCH_SIZE:
+                        with span("insert"):
+                            conn.executemany(sql, pending)
+                        inserted += len(pending)
+                        pending.clear()
+                    if rows is None:
+                        break
+                    pending.extend(rows)
+                count("rows", inserted)
+                with span("index build"):
+                    conn.execute("CREATE INDEX idx_parcels_amount_cents ON parcels(amount_cents)")
+                    conn.execute("CREATE INDEX idx_parcels_signing_epoch ON parcels(signing_epoch)")
+                with span("commit"):
+                    conn.commit()
+            enable_wal(conn)
+        finally:
+            conn.close()
+        stage.expect("parcels", inserted)
+    return inserted
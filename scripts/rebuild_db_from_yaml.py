@@ -1,167 +1,638 @@
 import os
+import sys
 import yaml
 import sqlite3
 import json
+import hashlib
+import argparse
 import pandas as pd
 
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
+
+from evidence_parser import load_yaml, natural_key, parse_files
+from bulk_loader import bulk_load, BATCH_SIZE
+from db_access import enable_wal, staged_build
+from tmk_parser import MISSING_KEY, tmk_keys
+from value_parser import parse_amount, parse_date
+import master_coords
+import evidence_store
+import db_schema
+import map_data
+from run_report import count, instrumented, span
+
 DB_PATH       = "data/hawaii.db"
 SOURCE_FOLDER = "evidence"
-TABLE_NAME    = "parcels"
+MANIFEST_TABLE = "evidence_manifest"
+META_TABLE     = "ingest_meta"
 
 MASTER_CSV_PATHS = [
     "data/Hawaii_tmk_master.csv",
     "data/Hawaii.csv"
 ]
 
+SUPPRESSION_CSV = "data/Hawaii_tmk_suppression_status.csv"
+
+# flush order matters: rows must exist before the rows that reference them
+INSERT_SQL = {
+    "certificates": """
+        INSERT INTO certificates (
+            id, certificate_number, sha256, document, source_path, blob_sha256, duplicate_count
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "tmk_parcels": """
+        INSERT INTO tmk_parcels (id, parcel_id, tmk_key, latitude, longitude)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "entities": """
+        INSERT INTO entities (id, name, is_json) VALUES (?, ?, ?)
+    """,
+    "transactions": """
+        INSERT INTO transactions (
+            id, certificate_id, tmk_parcel_id, natural_key, amount, parcel_valid,
+            gps_latitude, gps_longitude, registry_key, escrow_id, transfer_bank,
+            country, routing_code, account_fragment, link, method, signing_date,
+            amount_cents, currency, signing_epoch
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "transaction_entities": """
+        INSERT INTO transaction_entities (transaction_id, entity_id, role, position)
+        VALUES (?, ?, ?, ?)
+    """,
+    MANIFEST_TABLE: f"""
+        INSERT OR REPLACE INTO {MANIFEST_TABLE} (path, size, mtime_ns, sha256, row_count)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+}
+
+# related_entities keys → transaction_entities roles
+RELATED_ROLES = [
+    ("former_grantors", db_schema.ROLE_FORMER_GRANTOR),
+    ("true_grantees",   db_schema.ROLE_TRUE_GRANTEE),
+    ("intermediaries",  db_schema.ROLE_INTERMEDIARY),
+]
+
 def load_master_coords():
-    for path in MASTER_CSV_PATHS:
-        if os.path.exists(path):
-            df = pd.read_csv(path, dtype=str)
-            df.columns = [c.strip().lower() for c in df.columns]
-            if {"parcel_id","latitude","longitude"}.issubset(df.columns):
-                coords = {
-                    row["parcel_id"].strip(): (
-                        float(row["latitude"]), float(row["longitude"])
-                    )
-                    for _, row in df.iterrows()
-                    if str(row["parcel_id"]).strip()
-                }
-                print(f"ℹ️ Loaded {len(coords)} coords from {path}")
-                return coords
+    with span("load master coords"):
+        coords = master_coords.load_master_coords(MASTER_CSV_PATHS)
+    if coords is not None:
+        print(f"ℹ️ Loaded {len(coords)} coords from {coords.source}")
+        return coords
     print("⚠️ No master coords CSV found; only inline GPS will be used.")
-    return {}
+    return master_coords.empty_coords()
+
+def load_suppression_weights():
+    """
+    TMK key → numeric suppression weight from the suppression status CSV
+    (keyed by a TMK or parcel_id column). Non-numeric statuses and ids that
+    aren't TMKs are dropped.
+    """
+    if not os.path.exists(SUPPRESSION_CSV):
+        return None
+    df = pd.read_csv(SUPPRESSION_CSV, dtype=str)
+    key = next((c for c in ("TMK", "tmk", "parcel_id") if c in df.columns), None)
+    if key is None or "suppression_status" not in df.columns:
+        print(f"⚠️ {SUPPRESSION_CSV} has no TMK/suppression_status columns; skipping heat grid.")
+        return None
+    weights = pd.DataFrame({
+        "tmk_key": tmk_keys(df[key]),
+        "weight": pd.to_numeric(df["suppression_status"], errors="coerce"),
+    }).dropna()
+    weights = weights[weights["tmk_key"] != MISSING_KEY]
+    return weights.drop_duplicates("tmk_key", keep="last")
+
+def file_signature(paths):
+    """
+    Identify the first existing file of `paths` by (path, size, mtime), so
+    incremental builds can tell whether an input CSV changed since last run.
+    """
+    for path in paths:
+        if os.path.exists(path):
+            st = os.stat(path)
+            return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+    return ""
+
+def master_coords_signature():
+    # if the master changed, every stored lat/lon may be stale: full rebuild
+    return file_signature(MASTER_CSV_PATHS)
 
-def create_table(conn):
-    conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+def create_tables(conn):
+    db_schema.create_schema(conn)
+    create_manifest(conn, reset=True)
+    set_meta(conn, "schema_version", db_schema.SCHEMA_VERSION)
+    conn.commit()
+
+def create_manifest(conn, reset=False):
+    """
+    The manifest records every evidence file that contributed rows, so the
+    next incremental build can tell which files were added, changed or removed.
+    """
+    if reset:
+        conn.execute(f"DROP TABLE IF EXISTS {MANIFEST_TABLE}")
+        conn.execute(f"DROP TABLE IF EXISTS {META_TABLE}")
     conn.execute(f"""
-    CREATE TABLE {TABLE_NAME} (
-        certificate_id    TEXT,
-        sha256            TEXT,
-        document          TEXT,
-        grantor           TEXT,
-        grantee           TEXT,
-        amount            TEXT,
-        parcel_id         TEXT,
-        parcel_valid      BOOLEAN,
-        latitude          REAL,
-        longitude         REAL,
-        registry_key      TEXT,
-        escrow_id         TEXT,
-        transfer_bank     TEXT,
-        country           TEXT,
-        routing_code      TEXT,
-        account_fragment  TEXT,
-        link              TEXT,
-        method            TEXT,
-        signing_date      TEXT,
-        former_grantors   TEXT,
-        true_grantees     TEXT,
-        intermediaries    TEXT
+    CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+        path       TEXT PRIMARY KEY,
+        size       INTEGER,
+        mtime_ns   INTEGER,
+        sha256     TEXT,
+        row_count  INTEGER
     )
     """)
-    conn.commit()
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {META_TABLE} (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+def get_meta(conn, key):
+    row = conn.execute(f"SELECT value FROM {META_TABLE} WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def set_meta(conn, key, value):
+    conn.execute(
+        f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES (?, ?)",
+        (key, value)
+    )
+
+def unique_blobs(hashes):
+    """
+    Split {path: sha256} (evidence_store.sync) into the first path of each
+    distinct content, which gets parsed, and the remaining aliases. "First"
+    is in sorted path order, and `first` is in that order too, so full and
+    incremental builds agree on each blob's path and on who owns a row two
+    blobs share (see EvidenceWriter).
+    """
+    first, aliases = {}, []
+    for path, sha in sorted(hashes.items()):
+        if sha in first:
+            aliases.append((path, sha))
+        else:
+            first[sha] = path
+    return first, aliases
+
+def manifest_row(path, sha, row_count=0):
+    st = os.stat(path)
+    return (path, st.st_size, st.st_mtime_ns, sha, row_count)
+
+def entity_name(value):
+    """
+    (name, is_json) to store in `entities`: text as-is; structured and
+    numeric entries as their JSON text, exactly as json.dumps wrote them into
+    the old flat table's lists, so the parcels view reproduces those lists.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (dict, list, bool, int, float)):
+        return json.dumps(value, ensure_ascii=False, default=str), True
+    return str(value), False
+
+def parse_evidence_file(path):
+    """
+    Parse one evidence YAML for the normalized tables.
+    Runs in a parser worker: returns (path, sha256, parsed), with parsed None
+    when the file is skipped (invalid YAML or wrong shape), otherwise
+    (certificate, transactions). Each transaction is (parcel_id, fields,
+    links, natural key) where links are (role, position, entity_name()). Only
+    inline GPS is filled in; master-CSV coordinates are attached to parcels
+    by the writer.
+    """
+    fname = os.path.basename(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    sha_file = hashlib.sha256(raw).hexdigest()
+
+    # 1) Try to parse the YAML, skip on error
+    try:
+        data = load_yaml(raw) or {}
+    except yaml.YAMLError as e:
+        print(f"⚠️ Skipping invalid YAML `{fname}`: {e}")
+        return path, sha_file, None
+
+    if not isinstance(data, dict):
+        print(f"⚠️ Skipping non‐mapping YAML `{fname}`")
+        return path, sha_file, None
+
+    # 2) Determine certificate ID
+    cert = (
+        data.get("certificate_number")
+        or data.get("cert_id")
+        or data.get("document")
+        or fname
+    )
+    sha = data.get("sha256", "")
+    doc = data.get("document", "")
+
+    txs = data.get("transactions", [])
+    if not isinstance(txs, list):
+        print(f"⚠️ Skipping `{fname}`: transactions not a list")
+        return path, sha_file, None
+
+    # 3) Split each transaction into its own fields and entity links
+    parsed = []
+    for position, tx in enumerate(txs):
+        # GPS: inline only here
+        lat = lon = None
+        gps = tx.get("gps")
+        if isinstance(gps, (list, tuple)) and len(gps) >= 2:
+            lat, lon = gps[0], gps[1]
+
+        fields = (
+            tx.get("amount"),
+            bool(tx.get("parcel_valid")),
+            lat,
+            lon,
+            tx.get("registry_key"),
+            tx.get("escrow_id"),
+            tx.get("transfer_bank"),
+            tx.get("country"),
+            tx.get("routing_code"),
+            tx.get("account_fragment"),
+            tx.get("link"),
+            tx.get("method"),
+            tx.get("signing_date"),
+        )
+
+        links = []
+        for role in (db_schema.ROLE_GRANTOR, db_schema.ROLE_GRANTEE):
+            name = entity_name(tx.get(role))
+            if name is not None:
+                links.append((role, 0, name))
+
+        # Nested entities (may be missing)
+        re = tx.get("related_entities", {}) or {}
+        for key, role in RELATED_ROLES:
+            values = re.get(key) or []
+            if not isinstance(values, list):
+                values = [values]  # a lone name, not one entity per character
+            for pos, value in enumerate(values):
+                name = entity_name(value)
+                if name is not None:
+                    links.append((role, pos, name))
+
+        # same certificate, position and content → same key, whatever the file
+        key = natural_key(cert, position, tx.get("parcel_id"), fields, links)
+        # parsed once here, so queries range-scan instead of re-parsing text
+        fields += parse_amount(tx.get("amount")) + (parse_date(tx.get("signing_date")),)
+        parsed.append((tx.get("parcel_id"), fields, links, key))
+    return path, sha_file, ((cert, sha, doc), parsed)
+
+class EvidenceWriter:
+    """
+    Turns parse_evidence_file results into normalized rows and writes them
+    with executemany in batches. Ids are allocated here from in-memory maps
+    of the entities and parcels seen so far, so the load never has to read
+    back a row it just inserted.
 
-def build_db():
+    A transaction whose natural key is already in the DB (or earlier in this
+    load) belongs to the certificate with the lowest source path; the other
+    one counts it in its duplicate_count. A full build parses in path order,
+    so the first file always wins; an incremental one can add a file that
+    sorts before the current owner, and then the row is moved over to it.
+    """
+
+    def __init__(self, conn, coords):
+        self.conn = conn
+        self.coords = coords
+        self.entity_ids = {
+            (name, bool(is_json)): i
+            for i, name, is_json in conn.execute("SELECT id, name, is_json FROM entities")
+        }
+        self.parcel_ids = {pid: i for i, pid in conn.execute("SELECT id, parcel_id FROM tmk_parcels")}
+        self.cert_paths = dict(conn.execute("SELECT id, source_path FROM certificates"))
+        self.tx_owners = dict(conn.execute("SELECT natural_key, certificate_id FROM transactions"))
+        self.last_id = {
+            table: conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            for table in ("certificates", "tmk_parcels", "entities", "transactions")
+        }
+        self.pending = {table: [] for table in INSERT_SQL}
+        self.moved = []  # (new certificate, natural_key) of rows a lower path took over
+        self.inserted = 0
+
+    def _next_id(self, table):
+        self.last_id[table] += 1
+        return self.last_id[table]
+
+    def _entity_id(self, name):
+        eid = self.entity_ids.get(name)
+        if eid is None:
+            eid = self.entity_ids[name] = self._next_id("entities")
+            self.pending["entities"].append((eid,) + name)
+        return eid
+
+    def _add_parcels(self, parcel_ids):
+        """Register new parcel ids, with one vectorized master-coords lookup per file."""
+        new = [pid for pid in dict.fromkeys(parcel_ids) if pid not in self.parcel_ids]
+        if not new:
+            return
+        with span("coordinate resolution"):
+            keys = tmk_keys(new)
+            lat, lon, found = self.coords.lookup_keys(keys)
+        for pid, key, la, lo, ok in zip(new, keys.tolist(), lat.tolist(), lon.tolist(), found.tolist()):
+            pk = self.parcel_ids[pid] = self._next_id("tmk_parcels")
+            self.pending["tmk_parcels"].append((
+                pk, pid, key if key != MISSING_KEY else None,
+                la if ok else None, lo if ok else None,
+            ))
+
+    def add_file(self, path, sha, parsed):
+        """Queue one parsed evidence file and its manifest entry."""
+        rows = 0
+        if parsed is not None:
+            (cert, cert_sha, doc), txs = parsed
+            cert_pk = self._next_id("certificates")
+            self.cert_paths[cert_pk] = path
+            fresh, moved = [], 0
+            for tx in txs:
+                owner = self.tx_owners.get(tx[3])
+                if owner is None:
+                    fresh.append(tx)
+                elif path < self.cert_paths[owner]:
+                    self.moved.append((cert_pk, tx[3]))
+                    moved += 1
+                else:
+                    continue
+                self.tx_owners[tx[3]] = cert_pk
+            self.pending["certificates"].append(
+                (cert_pk, cert, cert_sha, doc, path, sha, len(txs) - len(fresh) - moved)
+            )
+
+            keys = [str(pid) if pid is not None else None for pid, _, _, _ in fresh]
+            self._add_parcels(k for k in keys if k is not None)
+
+            for key, (_, fields, links, tx_key) in zip(keys, fresh):
+                tx_pk = self._next_id("transactions")
+                parcel_pk = self.parcel_ids[key] if key is not None else None
+                self.pending["transactions"].append((tx_pk, cert_pk, parcel_pk, tx_key) + fields)
+                self.pending["transaction_entities"].extend(
+                    (tx_pk, self._entity_id(name), role, pos) for role, pos, name in links
+                )
+            count("duplicate_rows", len(txs) - len(fresh))
+            rows = len(fresh)
+        else:
+            count("skipped_files")
+
+        row = manifest_row(path, sha, rows)
+        self.pending[MANIFEST_TABLE].append(row)
+        count("files")
+        count("bytes", row[1])
+        count("rows", rows)
+        self.inserted += rows
+        if len(self.pending["transactions"]) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        with span("insert"):
+            for table, sql in INSERT_SQL.items():
+                rows = self.pending[table]
+                if rows:
+                    self.conn.executemany(sql, rows)
+                    rows.clear()
+            if self.moved:
+                # the previous owner now counts the row as a duplicate
+                self.conn.executemany(
+                    "UPDATE certificates SET duplicate_count = duplicate_count + 1 WHERE id = "
+                    "(SELECT certificate_id FROM transactions WHERE natural_key = ?)",
+                    [(key,) for _, key in self.moved],
+                )
+                self.conn.executemany(
+                    "UPDATE transactions SET certificate_id = ? WHERE natural_key = ?", self.moved
+                )
+                self.moved.clear()
+
+def no_progress(stage, **counts):
+    """
+    Default progress callback. Builders call progress(stage, ...) at each
+    stage and after every parsed file, with files_total / files_done /
+    rows_inserted counts where they apply (see rebuild_jobs.py).
+    """
+
+def insert_parsed(conn, parsed, coords, progress=no_progress):
+    """
+    Stream parse_evidence_file results into the normalized tables and
+    record every file in the manifest. Skipped files are still recorded
+    (with row_count 0) so an unchanged broken file isn't re-parsed on every
+    incremental build. Returns the number of transactions inserted.
+    """
+    writer = EvidenceWriter(conn, coords)
+    parsed = iter(parsed)
+    done = 0
+    while True:
+        # time spent waiting on the parser pool
+        with span("yaml parse"):
+            item = next(parsed, None)
+        if item is None:
+            break
+        writer.add_file(*item)
+        done += 1
+        progress("parse", files_done=done, rows_inserted=writer.inserted)
+    writer.flush()
+    return writer.inserted
+
+def build_db(incremental=False, workers=None, progress=no_progress):
     # Prepare DB
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
 
-    master_coords = load_master_coords()
-    conn = sqlite3.connect(DB_PATH)
-    create_table(conn)
+    if incremental and os.path.exists(DB_PATH):
+        conn = sqlite3.connect(DB_PATH)
+        create_manifest(conn)
+        if get_meta(conn, "schema_version") != db_schema.SCHEMA_VERSION:
+            print("ℹ️ DB schema is out of date; doing a full rebuild.")
+            conn.close()
+        elif get_meta(conn, "master_coords") != master_coords_signature():
+            print("ℹ️ Master coords changed since last build; doing a full rebuild.")
+            conn.close()
+        else:
+            try:
+                return update_db(conn, workers=workers, progress=progress)
+            finally:
+                conn.close()
+
+    # Build into a staging file next to the live DB; readers keep using the
+    # old one until the new one is validated and renamed into place.
+    progress("scan")
+    coords = load_master_coords()
+    with span("scan"):
+        hashes = evidence_store.sync(SOURCE_FOLDER)
+    first, aliases = unique_blobs(hashes)
+    count("duplicate_files", len(aliases))
+    with staged_build(DB_PATH) as stage:
+        conn = sqlite3.connect(stage.path)
+        try:
+            create_tables(conn)
+
+            # Parse evidence files in parallel, writing from here. A failed
+            # build only loses the staging file, so the journal can be off.
+            with bulk_load(conn, journal_mode="OFF"):
+                # each distinct content once; its other names only go in the manifest
+                progress("parse", files_total=len(first))
+                parsed = parse_files(list(first.values()), parse_evidence_file, workers)
+                inserted = insert_parsed(conn, parsed, coords, progress)
+                conn.executemany(INSERT_SQL[MANIFEST_TABLE], [manifest_row(p, sha) for p, sha in aliases])
+                progress("indexes")
+                with span("index build"):
+                    db_schema.create_indexes(conn)
+                    db_schema.refresh_search_index(conn)
+                    db_schema.refresh_spatial_index(conn)
+                progress("map clusters")
+                with span("map clusters"):
+                    map_data.refresh_map_clusters(conn)
+                progress("suppression grid")
+                with span("suppression grid"):
+                    map_data.refresh_suppression_grid(conn, load_suppression_weights())
+                set_meta(conn, "master_coords", master_coords_signature())
+                set_meta(conn, "suppression_csv", file_signature([SUPPRESSION_CSV]))
+                with span("commit"):
+                    conn.commit()
+            enable_wal(conn)
+        finally:
+            conn.close()
+        stage.expect("transactions", inserted)
+        stage.expect(MANIFEST_TABLE, len(hashes))
+        progress("validate and swap")
+    print(f"✅ Built {DB_PATH} with {inserted} transactions "
+          f"from {len(first)} distinct files ({len(aliases)} duplicate names).")
+    return inserted
+
+def update_db(conn, workers=None, progress=no_progress):
+    """
+    Bring an existing DB in line with `evidence/`, by content: parse only
+    blobs (evidence_store) the DB hasn't ingested yet, and drop the
+    certificates of blobs no file refers to any more. Touching a file, or
+    copying or renaming one that isn't its blob's lowest name, only updates
+    the manifest. Produces the same rows as a full rebuild.
+    """
+    known = {
+        path: (size, mtime_ns, sha)
+        for path, size, mtime_ns, sha in conn.execute(
+            f"SELECT path, size, mtime_ns, sha256 FROM {MANIFEST_TABLE}"
+        )
+    }
     inserted = 0
 
-    # Walk evidence folder
-    for root, _, files in os.walk(SOURCE_FOLDER):
-        for fname in files:
-            if not fname.lower().endswith((".yaml", ".yml")):
-                continue
-            path = os.path.join(root, fname)
+    # deleting a certificate cascades to its transactions and entity links
+    conn.execute("PRAGMA foreign_keys = ON")
 
-            # 1) Try to parse the YAML, skip on error
-            try:
-                data = yaml.safe_load(open(path, "r", encoding="utf-8")) or {}
-            except yaml.YAMLError as e:
-                print(f"⚠️ Skipping invalid YAML `{fname}`: {e}")
-                continue
+    # the DB is live, so keep its journal and fsync the WAL: a failed or
+    # crashed update must roll back, not corrupt the file
+    with bulk_load(conn, journal_mode=None, synchronous="NORMAL"):
 
-            if not isinstance(data, dict):
-                print(f"⚠️ Skipping non‐mapping YAML `{fname}`")
-                continue
+        progress("scan")
+        with span("scan"):
+            hashes = evidence_store.sync(SOURCE_FOLDER)
+        first, _ = unique_blobs(hashes)
+        ingested = {sha for _, _, sha in known.values()}
+        removed = ingested - set(first)
+        to_parse = {sha: path for sha, path in first.items() if sha not in ingested}
+        # a blob whose lowest name changed (renamed, or an alias dropped or
+        # added) is removed and re-added, so its rows are re-owned the way a
+        # full build would own them
+        moved = {
+            sha for sha, path in conn.execute("SELECT blob_sha256, source_path FROM certificates")
+            if sha in first and first[sha] != path
+        }
+        to_parse.update((sha, first[sha]) for sha in moved)
+        stale = removed | moved
 
-            # 2) Determine certificate ID
-            cert = (
-                data.get("certificate_number")
-                or data.get("cert_id")
-                or data.get("document")
-                or fname
-            )
-            sha = data.get("sha256", "")
-            doc = data.get("document", "")
+        conn.executemany(
+            "DELETE FROM certificates WHERE blob_sha256 = ?", [(sha,) for sha in stale]
+        )
+        if stale:
+            # transactions another certificate skipped as duplicates of the
+            # removed ones must now come from it: re-ingest those blobs too
+            for (sha,) in conn.execute(
+                "SELECT blob_sha256 FROM certificates WHERE duplicate_count > 0"
+            ).fetchall():
+                conn.execute("DELETE FROM certificates WHERE blob_sha256 = ?", (sha,))
+                to_parse[sha] = first[sha]
 
-            txs = data.get("transactions", [])
-            if not isinstance(txs, list):
-                print(f"⚠️ Skipping `{fname}`: transactions not a list")
+        # manifest: drop vanished paths, refresh the rest
+        conn.executemany(
+            f"DELETE FROM {MANIFEST_TABLE} WHERE path = ?",
+            [(p,) for p in set(known) - set(hashes)],
+        )
+        renamed = 0
+        for path, sha in hashes.items():
+            prev = known.get(path)
+            if to_parse.get(sha) == path:
+                continue  # written by the writer, with its row count
+            row = manifest_row(path, sha)
+            if prev == row[1:4]:
                 continue
+            if prev and prev[2] == sha:
+                conn.execute(
+                    f"UPDATE {MANIFEST_TABLE} SET size = ?, mtime_ns = ? WHERE path = ?",
+                    (row[1], row[2], path)
+                )
+            else:
+                conn.execute(INSERT_SQL[MANIFEST_TABLE], row)
+                renamed += 1
 
-            # 3) Insert each transaction
-            for tx in txs:
-                # GPS: inline or fallback
-                lat = lon = None
-                gps = tx.get("gps")
-                if isinstance(gps, (list, tuple)) and len(gps) >= 2:
-                    lat, lon = gps[0], gps[1]
-                else:
-                    pid = str(tx.get("parcel_id","")).strip()
-                    if pid in master_coords:
-                        lat, lon = master_coords[pid]
-
-                # Nested entities (may be missing)
-                re  = tx.get("related_entities", {}) or {}
-                former = re.get("former_grantors", []) or []
-                trueg  = re.get("true_grantees", [])  or []
-                inter  = re.get("intermediaries", []) or []
-
-                # Execute insert
-                conn.execute(f"""
-                    INSERT INTO {TABLE_NAME} (
-                        certificate_id, sha256, document, grantor, grantee,
-                        amount, parcel_id, parcel_valid, latitude, longitude,
-                        registry_key, escrow_id, transfer_bank, country,
-                        routing_code, account_fragment, link, method,
-                        signing_date, former_grantors, true_grantees, intermediaries
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    cert,
-                    sha,
-                    doc,
-                    tx.get("grantor"),
-                    tx.get("grantee"),
-                    tx.get("amount"),
-                    tx.get("parcel_id"),
-                    bool(tx.get("parcel_valid")),
-                    lat,
-                    lon,
-                    tx.get("registry_key"),
-                    tx.get("escrow_id"),
-                    tx.get("transfer_bank"),
-                    tx.get("country"),
-                    tx.get("routing_code"),
-                    tx.get("account_fragment"),
-                    tx.get("link"),
-                    tx.get("method"),
-                    tx.get("signing_date"),
-                    json.dumps(former, ensure_ascii=False),
-                    json.dumps(trueg,  ensure_ascii=False),
-                    json.dumps(inter,  ensure_ascii=False),
-                ))
-                inserted += 1
+        if to_parse:
+            progress("parse", files_total=len(to_parse))
+            # path order, like a full build: a row only moves away from a file already in the DB
+            parsed = parse_files(sorted(to_parse.values()), parse_evidence_file, workers)
+            inserted = insert_parsed(conn, parsed, load_master_coords(), progress)
 
-    conn.commit()
-    conn.close()
-    print(f"✅ Built {DB_PATH} with {inserted} transactions.")
+        added = len(to_parse)
+        if stale:
+            db_schema.prune_orphans(conn)
+        if added or stale or renamed:
+            # each path's row count is what its certificate owns now, 0 for
+            # aliases and skipped files, as a full build records it
+            conn.execute(
+                f"UPDATE {MANIFEST_TABLE} SET row_count = (SELECT COUNT(*) FROM transactions t "
+                f"JOIN certificates c ON c.id = t.certificate_id WHERE c.source_path = {MANIFEST_TABLE}.path)"
+            )
+        if added or stale:
+            progress("indexes")
+            with span("index build"):
+                db_schema.refresh_search_index(conn)
+                db_schema.refresh_spatial_index(conn)
+            progress("map clusters")
+            with span("map clusters"):
+                map_data.refresh_map_clusters(conn)
+
+        supp_signature = file_signature([SUPPRESSION_CSV])
+        if added or stale or get_meta(conn, "suppression_csv") != supp_signature:
+            progress("suppression grid")
+            with span("suppression grid"):
+                map_data.refresh_suppression_grid(conn, load_suppression_weights())
+            set_meta(conn, "suppression_csv", supp_signature)
+        with span("commit"):
+            conn.commit()
+
+    total = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    print(
+        f"✅ Updated {DB_PATH}: {added} files parsed, {len(removed)} removed, "
+        f"{renamed} new names for known content "
+        f"({inserted} rows inserted, {total} transactions total)."
+    )
     return inserted
 
 if __name__ == "__main__":
-    build_db()
+    p = argparse.ArgumentParser()
+    p.add_argument("--out-db", default=DB_PATH, help="path to the SQLite DB to build")
+    p.add_argument(
+        "--incremental", action="store_true",
+        help="only re-parse evidence files added or changed since the last build"
+    )
+    p.add_argument(
+        "--workers", type=int, default=None,
+        help="YAML parser processes (default: one per CPU core)"
+    )
+    p.add_argument(
+        "--profile", action="store_true",
+        help="also write a cProfile dump next to the run report (data/run_reports/)"
+    )
+    args = p.parse_args()
+    DB_PATH = args.out_db
+    with instrumented(
+        "rebuild_db_from_yaml", profile=args.profile,
+        incremental=args.incremental, workers=args.workers, db=DB_PATH,
+    ):
+        build_db(incremental=args.incremental, workers=args.workers)
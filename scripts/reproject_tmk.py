@@ -1,49 +1,67 @@
 #!/usr/bin/env python3
+"""
+scripts/reproject_tmk.py
+
+Reproject a projected-coordinate parcel CSV (parcel_id,latitude,longitude)
+to WGS84, streaming it in chunks across a process pool.
+
+    python scripts/reproject_tmk.py
+    python scripts/reproject_tmk.py -i in.csv -o out.csv --src-crs 3564 --workers 8
+"""
 import os
-import pandas as pd
-from pyproj import Transformer
+import sys
+import time
+import argparse
+
+#  ─ Add project root to Python path so we can import root‑level modules ─────────
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# ─────────────────────────────────────────────────────────────────────────────────
+
+from pyproj.exceptions import CRSError
+
+from reprojection import CHUNK_ROWS, DEFAULT_DST_CRS, DEFAULT_SRC_CRS, reproject_csv
+from run_report import instrumented
 
 def main():
-    # 1) Prompt for input CSV path
-    default_in = "data/Hawaii_tmk_master.csv"
-    in_path = input(f"Enter path to projected CSV [{default_in}]: ").strip() or default_in
-    if not os.path.exists(in_path):
-        print(f"❌ File not found: {in_path}")
-        return
-
-    # 2) Prompt for output CSV path
-    default_out = "data/Hawaii_tmk_master_wgs84.csv"
-    out_path = input(f"Enter output path for WGS84 CSV [{default_out}]: ").strip() or default_out
-
-    # 3) Load DataFrame
-    df = pd.read_csv(in_path, dtype=str)
-    required = {"parcel_id", "latitude", "longitude"}
-    if not required.issubset(df.columns):
-        print(f"❌ CSV must contain columns {required}; found {list(df.columns)}")
-        return
-
-    # Convert latitude/longitude to floats
-    df["latitude"]  = df["latitude"].astype(float)
-    df["longitude"] = df["longitude"].astype(float)
-
-    # 4) Prompt for source EPSG (default 3564)
-    epsg_default = "3564"
-    epsg_in = input(f"Enter EPSG code of input projection [{epsg_default}]: ").strip() or epsg_default
-    src_crs = f"EPSG:{epsg_in}"
-    dst_crs = "EPSG:4326"
-
-    # 5) Build transformer and reproject
-    transformer = Transformer.from_crs(src_crs, dst_crs, always_xy=True)
-    lons, lats = transformer.transform(
-        df["longitude"].tolist(),
-        df["latitude"].tolist()
-    )
-    df["longitude"], df["latitude"] = lons, lats
-
-    # 6) Save the new WGS84 CSV
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    df.to_csv(out_path, index=False)
-    print(f"✅ Reprojected {len(df)} rows → {out_path}")
+    parser = argparse.ArgumentParser(description="Reproject a parcel CSV to WGS84.")
+    parser.add_argument("-i", "--input", default="data/Hawaii_tmk_master.csv",
+                        help="projected CSV (default: %(default)s)")
+    parser.add_argument("-o", "--output", default="data/Hawaii_tmk_master_wgs84.csv",
+                        help="output WGS84 CSV (default: %(default)s)")
+    parser.add_argument("--src-crs", default=DEFAULT_SRC_CRS,
+                        help="input CRS, e.g. 3564 or EPSG:3564 (default: %(default)s)")
+    parser.add_argument("--dst-crs", default=DEFAULT_DST_CRS,
+                        help="output CRS (default: %(default)s)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS,
+                        help="rows per chunk (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--profile", action="store_true",
+                        help="also write a cProfile dump next to the run report (data/run_reports/)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ File not found: {args.input}")
+        sys.exit(1)
+
+    start = time.time()
+    try:
+        with instrumented(
+            "reproject_tmk", profile=args.profile, input=args.input, src_crs=args.src_crs,
+            dst_crs=args.dst_crs, chunksize=args.chunksize, workers=args.workers,
+        ):
+            rows = reproject_csv(
+                args.input, args.output, args.src_crs, args.dst_crs,
+                chunksize=args.chunksize, workers=args.workers,
+                progress=lambda n: print(f"ℹ️ {n} rows reprojected", end="\r", flush=True),
+            )
+    except (ValueError, CRSError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print()
+    print(f"✅ Reprojected {rows} rows → {args.output} in {time.time() - start:.1f}s")
 
 if __name__ == "__main__":
     main()
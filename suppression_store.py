@@ -0,0 +1,170 @@
+# suppression_store.py
+"""
+Indexed lookup over data/Hawaii_tmk_suppression_status.csv.
+
+The CSV is loaded once into a SQLite sidecar (`<csv>.index.db`) with an
+index on the canonical TMK key (tmk_parser.py), stamped with the CSV's sha256. get_store() keeps
+one open store per CSV in the process and only re-hashes the CSV when its
+size or mtime changes, rebuilding the sidecar if the hash differs. A
+single-TMK lookup is then one indexed SQLite read on a warm connection.
+"""
+import os
+import json
+import sqlite3
+import uuid
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from bulk_loader import bulk_load, executemany_batched
+from tmk_parser import MISSING_KEY, tmk_key, tmk_keys
+
+SUPPRESSION_CSV = os.path.join("data", "Hawaii_tmk_suppression_status.csv")
+INDEX_SUFFIX = ".index.db"
+KEY_COLUMNS = ("TMK", "tmk", "parcel_id")
+CSV_CHUNK_ROWS = 100_000
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def csv_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_index(csv_path, index_path, sha):
+    """Load the CSV into a fresh sidecar DB (temp file + rename)."""
+    # a unique temp name per build, so concurrent builds don't share one file
+    tmp = f"{index_path}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp"
+    conn = sqlite3.connect(tmp)
+    try:
+        reader = pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=CSV_CHUNK_ROWS)
+        columns = key = None
+        with bulk_load(conn, journal_mode="OFF"):
+            for chunk in reader:
+                if columns is None:
+                    columns = list(chunk.columns)
+                    key = next((c for c in KEY_COLUMNS if c in columns), None)
+                    if key is None:
+                        raise ValueError(f"{csv_path} has none of the columns {KEY_COLUMNS}")
+                    col_defs = ", ".join(f'"c{i}" TEXT' for i in range(len(columns)))
+                    conn.execute(
+                        f"CREATE TABLE suppression_status (tmk TEXT, tmk_key INTEGER, {col_defs})"
+                    )
+                keys = [k if k != MISSING_KEY else None for k in tmk_keys(chunk[key]).tolist()]
+                executemany_batched(
+                    conn,
+                    f"INSERT INTO suppression_status VALUES ({','.join('?' * (len(columns) + 2))})",
+                    zip(chunk[key].str.strip(), keys, *(chunk[c] for c in columns)),
+                )
+            if columns is None:
+                raise ValueError(f"{csv_path} is empty")
+            conn.execute("CREATE INDEX idx_suppression_tmk ON suppression_status(tmk)")
+            conn.execute("CREATE INDEX idx_suppression_tmk_key ON suppression_status(tmk_key)")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("sha256", sha), ("columns", json.dumps(columns))],
+            )
+    except BaseException:
+        conn.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    conn.close()
+    os.replace(tmp, index_path)
+
+
+class SuppressionStore:
+    """An open, read-only sidecar index for one suppression CSV."""
+
+    def __init__(self, csv_path, index_path):
+        self.csv_path = csv_path
+        self.index_path = index_path
+        self.conn = sqlite3.connect(
+            f"file:{index_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        self.sha256 = meta["sha256"]
+        self.columns = json.loads(meta["columns"])
+        self.stat_key = None
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def _frame(self, rows):
+        return pd.DataFrame([r[2:] for r in rows], columns=self.columns)
+
+    def lookup(self, tmk):
+        """
+        All CSV rows for one TMK, as a DataFrame with the CSV's columns.
+        Matched on the canonical TMK key, or on the stripped text if the
+        input isn't a TMK.
+        """
+        key = tmk_key(tmk)
+        if key is not None:
+            sql, param = "SELECT * FROM suppression_status WHERE tmk_key = ?", key
+        else:
+            sql, param = "SELECT * FROM suppression_status WHERE tmk = ?", str(tmk).strip()
+        with self.lock:
+            rows = self.conn.execute(sql, (param,)).fetchall()
+        return self._frame(rows)
+
+    def lookup_many(self, tmks):
+        """
+        CSV rows for many TMKs in one indexed join on their TMK keys. Returns
+        a DataFrame with a leading int64 "tmk_key" column and the CSV's
+        columns; TMKs without a record (or that don't parse) are absent.
+        """
+        return self.lookup_keys(tmk_keys(tmks))
+
+    def lookup_keys(self, keys):
+        """lookup_many() for ids already encoded with tmk_parser.tmk_keys()."""
+        keys = np.unique(np.asarray(keys, dtype=np.int64))
+        keys = json.dumps(keys[keys != MISSING_KEY].tolist())
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT s.* FROM json_each(?) j "
+                "JOIN suppression_status s ON s.tmk_key = j.value",
+                (keys,),
+            ).fetchall()
+        df = self._frame(rows)
+        df.insert(0, "tmk_key", np.array([r[1] for r in rows], dtype=np.int64))
+        return df
+
+
+def get_store(csv_path=SUPPRESSION_CSV):
+    """
+    The warm SuppressionStore for csv_path, (re)building its sidecar when
+    the CSV changed. Raises FileNotFoundError if the CSV doesn't exist.
+    """
+    st = os.stat(csv_path)
+    stat_key = (st.st_size, st.st_mtime_ns)
+    with _stores_lock:
+        store = _stores.get(csv_path)
+        if store is not None and store.stat_key == stat_key:
+            return store
+
+        sha = csv_sha256(csv_path)
+        if store is None or store.sha256 != sha:
+            index_path = csv_path + INDEX_SUFFIX
+            try:
+                candidate = SuppressionStore(csv_path, index_path)
+            except (sqlite3.Error, KeyError):
+                candidate = None
+            if candidate is None or candidate.sha256 != sha:
+                if candidate is not None:
+                    candidate.close()
+                build_index(csv_path, index_path, sha)
+                candidate = SuppressionStore(csv_path, index_path)
+            if store is not None:
+                store.close()
+            store = _stores[csv_path] = candidate
+        store.stat_key = stat_key
+        return store
@@ -0,0 +1,46 @@
+import os
+import sys
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bulk_loader import bulk_load, executemany_batched
+
+
+def pragmas(conn):
+    return {
+        name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+        for name in ("journal_mode", "synchronous", "cache_size", "temp_store")
+    }
+
+
+def test_load_commits_and_restores_pragmas(tmp_path):
+    conn = sqlite3.connect(tmp_path / "a.db")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    before = pragmas(conn)
+
+    with bulk_load(conn, journal_mode="OFF"):
+        n = executemany_batched(conn, "INSERT INTO t VALUES (?)", ((i,) for i in range(12)), 5)
+
+    assert n == 12
+    assert pragmas(conn) == before
+    other = sqlite3.connect(tmp_path / "a.db")
+    assert other.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 12
+
+
+def test_failed_update_of_a_live_db_rolls_back(tmp_path):
+    conn = sqlite3.connect(tmp_path / "live.db")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+
+    with pytest.raises(RuntimeError):
+        with bulk_load(conn, journal_mode=None, synchronous="NORMAL"):
+            conn.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("update failed")
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
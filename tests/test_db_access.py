@@ -0,0 +1,85 @@
+import os
+import sys
+import sqlite3
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db_access import STAGING_SUFFIX, ReadPool, read_generation, staged_build
+
+
+def make_db(path, rows=3):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_failed_build_leaves_live_db_untouched(tmp_path):
+    path = str(tmp_path / "live.db")
+    make_db(path)
+
+    with pytest.raises(RuntimeError):
+        with staged_build(path) as stage:
+            make_db(stage.path, rows=5)
+            raise RuntimeError("build failed")
+
+    assert count_rows(path) == 3
+    assert read_generation(path) == 0
+    assert not os.path.exists(path + STAGING_SUFFIX)
+
+
+def test_build_failing_validation_is_not_swapped_in(tmp_path):
+    path = str(tmp_path / "live.db")
+    make_db(path)
+
+    with pytest.raises(ValueError):
+        with staged_build(path) as stage:
+            make_db(stage.path, rows=5)
+            stage.expect("t", 6)
+
+    assert count_rows(path) == 3
+    assert not os.path.exists(path + STAGING_SUFFIX)
+
+
+def test_swap_moves_readers_to_the_new_db(tmp_path):
+    path = str(tmp_path / "live.db")
+    make_db(path)
+    pool = ReadPool(path)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 3
+
+    with staged_build(path) as stage:
+        make_db(stage.path, rows=5)
+        stage.expect("t", 5)
+
+    assert read_generation(path) == 1
+    assert not os.path.exists(path + STAGING_SUFFIX)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 5
+
+
+def test_failed_read_sql_query_discards_the_connection(tmp_path):
+    path = str(tmp_path / "live.db")
+    make_db(path)
+    pool = ReadPool(path, size=1)
+
+    with pytest.raises(pd.errors.DatabaseError):
+        with pool.connection() as conn:
+            broken = conn
+            pd.read_sql_query("SELECT * FROM no_such_table", conn)
+
+    with pool.connection() as conn:
+        assert conn is not broken
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 3
@@ -0,0 +1,111 @@
+import os
+import sys
+import sqlite3
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (ROOT, os.path.join(ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import rebuild_db_from_yaml
+
+EVIDENCE = """\
+certificate_number: CERT-1
+sha256: "{sha}"
+document: {document}
+transactions:
+  - grantor: Alpha LLC
+    grantee: Beta LLC
+    amount: "$1,200.50"
+    parcel_id: "389014053"
+    signing_date: "2020-01-02"
+  - grantor: Gamma LLC
+    grantee: Delta LLC
+    amount: "$2,000.00"
+    parcel_id: "389014054"
+    signing_date: "2021-03-04"
+"""
+
+
+def write_evidence(name, document, sha):
+    with open(os.path.join("evidence", name), "w") as f:
+        f.write(EVIDENCE.format(document=document, sha=sha))
+
+
+def snapshot(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            "parcels": sorted(conn.execute(
+                "SELECT certificate_id, sha256, document, source_path, grantor, grantee, "
+                "amount, parcel_id FROM parcels"
+            )),
+            "certificates": sorted(conn.execute(
+                "SELECT certificate_number, document, source_path, blob_sha256, duplicate_count "
+                "FROM certificates"
+            )),
+            "manifest": sorted(conn.execute(
+                "SELECT path, sha256, row_count FROM evidence_manifest"
+            )),
+        }
+    finally:
+        conn.close()
+
+
+def build(incremental, db_path):
+    rebuild_db_from_yaml.DB_PATH = db_path
+    rebuild_db_from_yaml.build_db(incremental=incremental, workers=1)
+    return snapshot(db_path)
+
+
+def test_near_duplicate_sorting_first_matches_full_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("evidence")
+    os.makedirs("data")
+
+    write_evidence("b.yaml", "b.pdf", "b" * 64)
+    build(False, os.path.join("data", "incremental.db"))
+
+    # same certificate and transactions, another document header; sorts first
+    write_evidence("a.yaml", "a.pdf", "a" * 64)
+    incremental = build(True, os.path.join("data", "incremental.db"))
+    full = build(False, os.path.join("data", "full.db"))
+
+    assert incremental == full
+    assert {row[3] for row in full["parcels"]} == {os.path.join("evidence", "a.yaml")}
+
+
+def test_renaming_the_owning_file_matches_full_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("evidence")
+    os.makedirs("data")
+
+    write_evidence("b.yaml", "y.pdf", "b" * 64)
+    write_evidence("c.yaml", "x.pdf", "c" * 64)
+    build(False, os.path.join("data", "incremental.db"))
+
+    # the owner now sorts after c.yaml, which should take its rows
+    os.rename(os.path.join("evidence", "b.yaml"), os.path.join("evidence", "d.yaml"))
+    incremental = build(True, os.path.join("data", "incremental.db"))
+    full = build(False, os.path.join("data", "full.db"))
+
+    assert incremental == full
+    assert {row[2] for row in full["parcels"]} == {"x.pdf"}
+
+
+def test_dropping_the_lowest_alias_matches_full_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("evidence")
+    os.makedirs("data")
+
+    write_evidence("a.yaml", "y.pdf", "a" * 64)
+    write_evidence("d.yaml", "y.pdf", "a" * 64)  # same content: an alias of a.yaml
+    write_evidence("c.yaml", "x.pdf", "c" * 64)
+    build(False, os.path.join("data", "incremental.db"))
+
+    os.remove(os.path.join("evidence", "a.yaml"))
+    incremental = build(True, os.path.join("data", "incremental.db"))
+    full = build(False, os.path.join("data", "full.db"))
+
+    assert incremental == full
+    assert {row[2] for row in full["parcels"]} == {"x.pdf"}
@@ -0,0 +1,71 @@
+import os
+import sys
+import sqlite3
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (ROOT, os.path.join(ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import rebuild_db_from_yaml
+from map_data import (
+    HAWAII_BOUNDS, bounds_from_folium, count_in_bbox, expand_bbox, parcels_in_bbox,
+    viewport_data,
+)
+
+# 053 twice (two spellings, two transfers), 054 once, one transaction without
+# a parcel id, and 055 far off on another island
+EVIDENCE = """\
+certificate_number: CERT-1
+transactions:
+  - grantor: A
+    parcel_id: "389014053"
+    gps: [19.50, -155.50]
+  - grantor: B
+    parcel_id: "TMK (3) 8-9-014:053"
+    gps: [19.50, -155.50]
+  - grantor: C
+    parcel_id: "389014054"
+    gps: [19.51, -155.51]
+  - grantor: D
+    gps: [19.52, -155.52]
+  - grantor: E
+    parcel_id: "389014055"
+    gps: [21.30, -157.85]
+"""
+
+BIG_ISLAND = (19.0, -156.0, 20.0, -155.0)
+
+
+def build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("evidence")
+    os.makedirs("data")
+    with open(os.path.join("evidence", "a.yaml"), "w") as f:
+        f.write(EVIDENCE)
+    rebuild_db_from_yaml.DB_PATH = os.path.join("data", "hawaii.db")
+    rebuild_db_from_yaml.build_db(workers=1)
+    return sqlite3.connect(rebuild_db_from_yaml.DB_PATH)
+
+
+def test_viewport_counts_and_draws_each_parcel_once(tmp_path, monkeypatch):
+    conn = build(tmp_path, monkeypatch)
+
+    assert count_in_bbox(conn, BIG_ISLAND) == 3
+    assert len(parcels_in_bbox(conn, BIG_ISLAND)) == 3
+    assert count_in_bbox(conn, HAWAII_BOUNDS) == 4
+    assert count_in_bbox(conn, (0.0, 0.0, 1.0, 1.0)) == 0
+    clusters = conn.execute("SELECT SUM(count) FROM map_clusters WHERE zoom = 5").fetchone()[0]
+    assert clusters == 4
+
+    count, tier, frame = viewport_data(conn, BIG_ISLAND, 16)
+    assert (count, tier, len(frame)) == (3, "markers", 3)
+
+
+def test_bbox_helpers():
+    assert expand_bbox((0.0, 0.0, 2.0, 4.0), 0.5) == (-1.0, -2.0, 3.0, 6.0)
+    bounds = {"_southWest": {"lat": 19, "lng": -156}, "_northEast": {"lat": 20, "lng": -155}}
+    assert bounds_from_folium(bounds) == BIG_ISLAND
+    assert bounds_from_folium({}) is None
+    assert bounds_from_folium({"_southWest": {"lat": 20, "lng": -155},
+                               "_northEast": {"lat": 19, "lng": -156}}) is None
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import rebuild_jobs
+from rebuild_jobs import CANCELLED, QUEUED, SUCCEEDED
+
+EVIDENCE = """\
+certificate_number: CERT-1
+transactions:
+  - grantor: Alpha LLC
+    parcel_id: "389014053"
+  - grantor: Gamma LLC
+    parcel_id: "389014054"
+"""
+
+
+def setup_evidence(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("evidence")
+    os.makedirs("data")
+    with open(os.path.join("evidence", "a.yaml"), "w") as f:
+        f.write(EVIDENCE)
+
+
+def add_job(status=QUEUED, pid=None, kind="full"):
+    conn = rebuild_jobs.connect()
+    try:
+        now = time.time()
+        return conn.execute(
+            "INSERT INTO jobs (kind, status, pid, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, status, pid, now, now),
+        ).lastrowid
+    finally:
+        conn.close()
+
+
+def wait_for(job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = rebuild_jobs.get_job(job_id)
+        if job["status"] not in rebuild_jobs.ACTIVE:
+            return job
+        rebuild_jobs.active_job()  # reaps the worker once it has exited
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} still {job['status']} after {timeout}s")
+
+
+def test_submit_runs_a_worker_and_is_single_flight(tmp_path, monkeypatch):
+    setup_evidence(tmp_path, monkeypatch)
+
+    job_id = rebuild_jobs.submit("full")
+    assert rebuild_jobs.submit("incremental") == job_id  # joins the active job
+
+    job = wait_for(job_id)
+    assert job["status"] == SUCCEEDED, rebuild_jobs.read_log(job)
+    assert job["stage"] == "done"
+    assert job["rows_inserted"] == 2
+    assert os.path.exists(os.path.join("data", "hawaii.db"))
+    assert rebuild_jobs.submit("incremental") != job_id  # the next one starts fresh
+
+
+def test_run_job_records_progress_and_result(tmp_path, monkeypatch):
+    setup_evidence(tmp_path, monkeypatch)
+    job_id = add_job()
+
+    rebuild_jobs.run_job(job_id)
+
+    job = rebuild_jobs.get_job(job_id)
+    assert job["status"] == SUCCEEDED
+    assert (job["files_total"], job["files_done"], job["rows_inserted"]) == (1, 1, 2)
+    assert job["started_at"] and job["finished_at"]
+
+
+def test_cancel_stops_the_worker(tmp_path, monkeypatch):
+    setup_evidence(tmp_path, monkeypatch)
+    worker = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"],
+                              start_new_session=True)
+    job_id = add_job(rebuild_jobs.RUNNING, pid=worker.pid)
+
+    assert rebuild_jobs.cancel(job_id)
+    worker.wait(timeout=10)
+    assert wait_for(job_id)["status"] == CANCELLED
+    assert not rebuild_jobs.cancel(job_id)  # already finished
+
+
+def test_cancelled_job_never_builds(tmp_path, monkeypatch):
+    setup_evidence(tmp_path, monkeypatch)
+    job_id = add_job()
+    assert rebuild_jobs.cancel(job_id)  # no worker yet: only marked
+
+    rebuild_jobs.run_job(job_id)
+
+    assert rebuild_jobs.get_job(job_id)["status"] == CANCELLED
+    assert not os.path.exists(os.path.join("data", "hawaii.db"))
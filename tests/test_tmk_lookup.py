@@ -0,0 +1,54 @@
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (ROOT, os.path.join(ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import rebuild_db_from_yaml
+from tmk_lookup import bulk_lookup
+
+EVIDENCE = """\
+certificate_number: CERT-1
+transactions:
+  - grantor: Alpha LLC
+    grantee: Beta LLC
+    parcel_id: "389014053"
+    gps: [19.5, -155.5]
+  - grantor: Gamma LLC
+    grantee: Delta LLC
+    parcel_id: "TMK (3) 8-9-014:054"
+"""
+
+
+def test_bulk_lookup_matches_any_tmk_spelling(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("evidence")
+    os.makedirs("data")
+    with open(os.path.join("evidence", "a.yaml"), "w") as f:
+        f.write(EVIDENCE)
+    with open(os.path.join("data", "Hawaii_tmk_master.csv"), "w") as f:
+        f.write("parcel_id,latitude,longitude\n389014054,19.6,-155.6\n")
+    with open(os.path.join("data", "Hawaii_tmk_suppression_status.csv"), "w") as f:
+        f.write("TMK,suppression_status\n3-8-9-014:053,1\n")
+    rebuild_db_from_yaml.DB_PATH = os.path.join("data", "hawaii.db")
+    rebuild_db_from_yaml.build_db(workers=1)
+
+    tmks = ["(3) 8-9-014:053", "389014054", "389014099", "not a tmk", "389014053"]
+    result = bulk_lookup(
+        tmks,
+        db_path=str(tmp_path / "data" / "hawaii.db"),
+        csv_path=str(tmp_path / "data" / "Hawaii_tmk_suppression_status.csv"),
+    )
+
+    assert result["TMK"].tolist() == tmks
+    canonical = result["canonical_tmk"]
+    assert canonical.isna().tolist() == [False, False, False, True, False]
+    assert canonical.dropna().tolist() == ["389014053", "389014054", "389014099", "389014053"]
+    assert result["suppression_record"].tolist() == [True, False, False, False, True]
+    assert result["suppression_status"].tolist()[0] == "1"
+    # inline GPS for 053, master coords for 054, nothing for the rest
+    assert result["latitude"].tolist()[:2] == [19.5, 19.6]
+    assert result["latitude"].iloc[2:4].isna().all()
+    assert result["latitude"].iloc[4] == 19.5
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tmk_parser import MISSING_KEY, TMK, format_tmk, parse_tmk, tmk_key, tmk_keys
+
+FORMS = [
+    "389014053",
+    "TMK (3) 8-9-014:053",
+    "(3) 8-9-014:053",
+    "3-8-9-014-053",
+    "3890140530000",
+    "389014053.0",
+    " 389014053 ",
+]
+
+
+def test_formatted_and_plain_tmks_share_a_key():
+    keys = {tmk_key(form) for form in FORMS}
+    assert keys == {tmk_key("389014053")}
+    assert parse_tmk("389014053") == TMK(3, 8, 9, 14, 53, 0)
+    assert format_tmk(tmk_key("TMK (3) 8-9-014:053")) == "389014053"
+
+
+def test_cpr_and_missing_island_are_kept_apart():
+    assert tmk_key("3-8-9-014-053-0001") != tmk_key("389014053")
+    assert parse_tmk("TMK 1-2-3:088") == TMK(0, 1, 2, 3, 88, 0)
+    assert format_tmk(tmk_key("TMK 1-2-3:088")) == "1-2-003:088"
+
+
+def test_vectorized_keys_match_single_keys():
+    values = FORMS + ["not a tmk", None, "", "12345"]
+    expected = [tmk_key(v) if tmk_key(v) is not None else MISSING_KEY for v in values]
+    assert tmk_keys(values).tolist() == expected
+    assert expected[-4:] == [MISSING_KEY] * 4
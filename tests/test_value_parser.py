@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from value_parser import MAX_CENTS, NO_AMOUNT, Amount, parse_amount
+
+
+def test_parses_dollar_amount():
+    assert parse_amount("$1,200.50") == Amount(120050, "USD")
+
+
+def test_overflowing_amount_is_unparseable():
+    assert parse_amount("$99,999,999,999,999,999") == NO_AMOUNT
+    assert parse_amount("9" * 40) == NO_AMOUNT
+    assert parse_amount(f"{MAX_CENTS // 100}").cents is not None
+
+
+def test_malformed_amount_is_unparseable():
+    assert parse_amount("$1,2x0.50") == NO_AMOUNT
+    assert parse_amount("twelve hundred") == NO_AMOUNT
+    assert parse_amount("") == NO_AMOUNT
@@ -0,0 +1,61 @@
+# tmk_lookup.py
+"""
+Batch TMK lookup behind the TMK checker's batch mode (pages/tmk_checker.py).
+
+bulk_lookup() takes the TMKs as typed or uploaded and returns one row per
+input: its canonical form, its suppression columns (through the indexed
+suppression_store) and latitude/longitude from the DB. Each source is read
+in one query over the distinct int64 TMK keys and joined back on the key,
+so "TMK (3) 8-9-014:053" and "389014053" find the same parcel.
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from db_access import DB_PATH, query_df
+from suppression_store import SUPPRESSION_CSV, get_store
+from tmk_parser import MISSING_KEY, format_tmks, tmk_keys
+
+
+def bulk_lookup(tmks, db_path=DB_PATH, csv_path=SUPPRESSION_CSV):
+    """
+    One row per input TMK: TMK, canonical_tmk, the suppression CSV's columns,
+    suppression_record (whether it has one), latitude and longitude.
+    """
+    keys = tmk_keys(tmks)
+    result = pd.DataFrame({"TMK": tmks, "tmk_key": keys})
+    result["canonical_tmk"] = format_tmks(keys)
+
+    supp = get_store(csv_path).lookup_keys(keys).drop_duplicates("tmk_key")
+    supp = supp.drop(columns=[c for c in ("TMK", "tmk", "parcel_id") if c in supp.columns])
+    result = result.merge(supp, on="tmk_key", how="left", indicator="suppression_record")
+    result["suppression_record"] = result["suppression_record"] == "both"
+
+    if os.path.exists(db_path):
+        unique_keys = np.unique(keys[keys != MISSING_KEY])
+        # driven from the input keys through idx_tmk_parcels_tmk_key and
+        # idx_transactions_parcel (the parcels view would scan every
+        # transaction); inline GPS wins over master coords, as in the view
+        coords = query_df(
+            """
+            SELECT tmk_key, latitude, longitude FROM (
+                SELECT p.tmk_key,
+                       CASE WHEN t.gps_latitude IS NULL AND t.gps_longitude IS NULL
+                            THEN p.latitude ELSE t.gps_latitude END AS latitude,
+                       CASE WHEN t.gps_latitude IS NULL AND t.gps_longitude IS NULL
+                            THEN p.longitude ELSE t.gps_longitude END AS longitude
+                FROM json_each(?) AS k
+                CROSS JOIN tmk_parcels p ON p.tmk_key = k.value
+                CROSS JOIN transactions t ON t.tmk_parcel_id = p.id
+            )
+            WHERE latitude IS NOT NULL
+            """,
+            (json.dumps(unique_keys.tolist()),),
+            path=db_path,
+        ).drop_duplicates("tmk_key")
+        result = result.merge(coords.astype({"tmk_key": np.int64}), on="tmk_key", how="left")
+    else:
+        result["latitude"] = result["longitude"] = float("nan")
+    return result.drop(columns="tmk_key")
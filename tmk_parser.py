@@ -0,0 +1,161 @@
+# tmk_parser.py
+"""
+Canonical parsing of Hawaii TMKs (tax map keys) and their int64 join key.
+
+Parcel ids turn up as 9-digit strings ("389014053"), dashed/colon forms
+("TMK 1-2-3:088", "(3) 8-9-014:053", "3-8-9-014-053-0001"), and as numbers
+that went through a float column ("389014053.0"). parse_tmk() reads all of
+these into island/zone/section/plat/parcel/cpr components, and encode()
+packs them into one fixed-width decimal int64:
+
+    I Z S PPP PPPP CCCC      (island, zone, section, plat, parcel, cpr)
+
+so "389014053", "(3) 8-9-014:053" and "3890140530000" share a key. The
+island digit is 0 when the source doesn't carry it ("TMK 1-2-3:088").
+
+Every join on parcel ids (ingest vs. master coords, suppression lookups,
+extract_gps) goes through tmk_key()/tmk_keys() instead of comparing strings.
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+TMK = namedtuple("TMK", "island zone section plat parcel cpr")
+
+# int64 stand-in for "not a TMK" in key arrays
+MISSING_KEY = -1
+
+_FIELD_LIMITS = TMK(island=10, zone=10, section=10, plat=1000, parcel=10000, cpr=10000)
+_PREFIX = re.compile(r"^\s*TMK[\s:#.\-]*", re.IGNORECASE)
+_FLOAT_TAIL = re.compile(r"^(\d+)\.0*$")
+_ISLAND = re.compile(r"^\(\s*(\d)\s*\)")
+_DIGITS = re.compile(r"\d+")
+
+# all-digit forms by length: field widths in TMK order
+_DIGIT_LAYOUTS = {
+    8:  (0, 1, 1, 3, 3, 0),
+    9:  (1, 1, 1, 3, 3, 0),
+    13: (1, 1, 1, 3, 3, 4),
+}
+
+
+def _make(island, zone, section, plat, parcel, cpr=0):
+    tmk = TMK(island, zone, section, plat, parcel, cpr)
+    if any(v >= limit for v, limit in zip(tmk, _FIELD_LIMITS)):
+        return None
+    return tmk
+
+
+def parse_tmk(value):
+    """Parse a TMK in any known format into a TMK tuple, or None."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        value = int(value)
+    text = _PREFIX.sub("", str(value).strip())
+    m = _FLOAT_TAIL.match(text)
+    if m:
+        text = m.group(1)
+
+    if text.isdigit():
+        layout = _DIGIT_LAYOUTS.get(len(text))
+        if layout is None:
+            return None
+        fields, pos = [], 0
+        for width in layout:
+            fields.append(int(text[pos:pos + width]) if width else 0)
+            pos += width
+        return _make(*fields)
+
+    island = None
+    m = _ISLAND.match(text)
+    if m:
+        island = int(m.group(1))
+        text = text[m.end():]
+    groups = [int(g) for g in _DIGITS.findall(text)]
+
+    if island is not None:
+        if len(groups) in (4, 5):
+            return _make(island, *groups)
+        return None
+    if len(groups) == 4:
+        return _make(0, *groups)
+    if len(groups) in (5, 6):
+        return _make(*groups)
+    return None
+
+
+def encode(tmk):
+    """Pack a TMK tuple into its int64 key."""
+    island, zone, section, plat, parcel, cpr = tmk
+    return ((((island * 10 + zone) * 10 + section) * 1000 + plat) * 10000 + parcel) * 10000 + cpr
+
+
+def decode(key):
+    """Unpack an int64 key back into a TMK tuple."""
+    key, cpr = divmod(int(key), 10000)
+    key, parcel = divmod(key, 10000)
+    key, plat = divmod(key, 1000)
+    key, section = divmod(key, 10)
+    island, zone = divmod(key, 10)
+    return TMK(island, zone, section, plat, parcel, cpr)
+
+
+def format_tmk(key):
+    """Canonical display form of a key: "389014053" style, or "1-2-003:088" without an island."""
+    t = decode(key)
+    if t.island:
+        text = f"{t.island}{t.zone}{t.section}{t.plat:03d}{t.parcel:03d}"
+    else:
+        text = f"{t.zone}-{t.section}-{t.plat:03d}:{t.parcel:03d}"
+    return f"{text}-{t.cpr:04d}" if t.cpr else text
+
+
+def format_tmks(keys):
+    """
+    Vectorized format_tmk(): an object array of canonical strings, None
+    where the key is MISSING_KEY. Island-prefixed keys without a CPR (the
+    common case) are formatted with NumPy, the rest one by one.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    out = np.full(len(keys), None, dtype=object)
+    parcel = keys // 10000 % 10000
+    plain = (keys >= 10 ** 13) & (keys % 10000 == 0) & (parcel < 1000)
+    nine = keys[plain] // 10 ** 8 * 1000 + parcel[plain]
+    out[plain] = nine.astype(str).astype(object)
+    for i in np.flatnonzero(~plain & (keys != MISSING_KEY)):
+        out[i] = format_tmk(keys[i])
+    return out
+
+
+def tmk_key(value):
+    """int64 key for one TMK value, or None if it doesn't parse."""
+    tmk = parse_tmk(value)
+    return encode(tmk) if tmk is not None else None
+
+
+def tmk_keys(values):
+    """
+    Vectorized tmk_key(): an int64 array with MISSING_KEY where a value
+    doesn't parse. Each distinct value is parsed once, and plain 9-digit
+    strings (the common case) skip the parser entirely.
+    """
+    codes, uniques = pd.factorize(pd.Series(list(values), dtype=object))
+    if not len(uniques):
+        return np.full(len(codes), MISSING_KEY, dtype=np.int64)
+
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    ukeys = np.full(len(uniques), MISSING_KEY, dtype=np.int64)
+    nine = text.str.fullmatch(r"\d{9}").to_numpy()
+    n = text[nine].astype(np.int64).to_numpy()
+    ukeys[nine] = (n // 1000 * 10000 + n % 1000) * 10000
+    for i in np.flatnonzero(~nine):
+        key = tmk_key(uniques[i])
+        if key is not None:
+            ukeys[i] = key
+
+    return np.where(codes >= 0, ukeys[np.maximum(codes, 0)], MISSING_KEY)
@@ -0,0 +1,137 @@
+# upload_sink.py
+"""
+One write path for every uploader page.
+
+save_upload() copies an uploaded file (anything with .read(), e.g. a
+Streamlit UploadedFile) to disk CHUNK_SIZE bytes at a time, hashing it as
+it goes, into a temp file next to the destination that is renamed over it
+only once complete, so readers never see a half-written CSV or zip. Each
+upload is recorded in the `uploads` table of data/uploads.db with its size
+and sha256, so later steps can dedupe or skip unchanged files without
+reading them again.
+
+    rec = save_upload(up, "data")
+    rec.path, rec.sha256, rec.size
+"""
+import os
+import time
+import uuid
+import hashlib
+import sqlite3
+from collections import namedtuple
+
+CATALOG_DB = os.path.join("data", "uploads.db")
+CHUNK_SIZE = 1024 * 1024
+
+UPLOADS_TABLE = """
+    CREATE TABLE IF NOT EXISTS uploads (
+        id           INTEGER PRIMARY KEY,
+        name         TEXT NOT NULL,
+        path         TEXT NOT NULL,
+        size         INTEGER NOT NULL,
+        sha256       TEXT NOT NULL,
+        uploaded_at  REAL NOT NULL
+    )
+"""
+UPLOADS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_uploads_sha256 ON uploads(sha256)",
+    "CREATE INDEX IF NOT EXISTS idx_uploads_path ON uploads(path, uploaded_at)",
+]
+
+UploadRecord = namedtuple("UploadRecord", "name path size sha256 uploaded_at")
+
+
+def connect_catalog(path=CATALOG_DB):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10.0)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(UPLOADS_TABLE)
+    for ddl in UPLOADS_INDEXES:
+        conn.execute(ddl)
+    return conn
+
+
+def safe_name(name):
+    """The upload's base name: browsers can send paths, and '..' must not escape dest_dir."""
+    name = os.path.basename(name.replace("\\", "/"))
+    if name in ("", ".", ".."):
+        raise ValueError(f"Invalid upload file name: {name!r}")
+    return name
+
+
+def stream_to_file(src, path, chunk_size=CHUNK_SIZE):
+    """Copy file object `src` to `path` chunk by chunk. Returns (size, sha256 hex digest)."""
+    if hasattr(src, "seek"):
+        src.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def last_upload(path, conn):
+    row = conn.execute(
+        "SELECT name, path, size, sha256, uploaded_at FROM uploads "
+        "WHERE path = ? ORDER BY uploaded_at DESC LIMIT 1",
+        (path,),
+    ).fetchone()
+    return UploadRecord(*row) if row else None
+
+
+def save_upload(upload, dest_dir, name=None, catalog=CATALOG_DB):
+    """
+    Stream `upload` into dest_dir/<name> (default: upload.name) via a
+    uniquely named `.part` temp file (concurrent uploads of the same name
+    don't share it) and an atomic rename, and record it in the catalog.
+    Returns an UploadRecord.
+
+    Streamlit re-runs the page with the same uploads on every interaction;
+    if the destination already holds exactly this content (per the catalog),
+    it is left untouched, mtime included, and its existing record returned.
+    """
+    name = safe_name(name or upload.name)
+    os.makedirs(dest_dir, exist_ok=True)
+    dest = os.path.join(dest_dir, name)
+    tmp = f"{dest}.{os.getpid()}-{uuid.uuid4().hex[:8]}.part"
+    try:
+        size, sha256 = stream_to_file(upload, tmp)
+        conn = connect_catalog(catalog)
+        try:
+            previous = last_upload(dest, conn)
+            if (previous and previous.sha256 == sha256 and os.path.exists(dest)
+                    and os.path.getsize(dest) == size):
+                return previous
+            os.replace(tmp, dest)
+            rec = UploadRecord(name, dest, size, sha256, time.time())
+            with conn:
+                conn.execute(
+                    "INSERT INTO uploads (name, path, size, sha256, uploaded_at) VALUES (?, ?, ?, ?, ?)",
+                    rec,
+                )
+            return rec
+        finally:
+            conn.close()
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def find_uploads(sha256, catalog=CATALOG_DB):
+    """Earlier uploads with the same content, newest first."""
+    conn = connect_catalog(catalog)
+    try:
+        rows = conn.execute(
+            "SELECT name, path, size, sha256, uploaded_at FROM uploads "
+            "WHERE sha256 = ? ORDER BY uploaded_at DESC",
+            (sha256,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [UploadRecord(*r) for r in rows]
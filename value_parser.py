@@ -0,0 +1,120 @@
+# value_parser.py
+"""
+Parsing of the free-text transaction amounts and signing dates at ingest.
+
+Amounts turn up as "$1,200.50", "USD 1200", "1,200.50 EUR", "€ 3.5 million",
+"(2,000.00)" and as bare YAML numbers. parse_amount() reads them into an
+integer number of cents (minor units) plus an ISO 4217 currency code, or
+None where the text names none ("1200"). Decimal arithmetic, so
+"$0.29" is 29 cents, not 28.
+
+Dates turn up as YAML dates (an unquoted 2020-01-02 already loads as a
+datetime.date), ISO strings with or without a time, US "01/02/2020" and
+spelled-out months ("January 2, 2020", "2 Jan 2020"). parse_date() reads
+them into whole seconds since the Unix epoch at UTC midnight of that day.
+
+The builders store both next to the original text (amount_cents, currency,
+signing_epoch), indexed, so "amount ≥ X signed between A and B" is an index
+range scan rather than Python parsing every row on each query. Values that
+can't be read, and amounts outside the signed 64-bit range of cents, are
+stored as NULL; the original text is kept as-is.
+"""
+import re
+import datetime
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+Amount = namedtuple("Amount", "cents currency")
+
+NO_AMOUNT = Amount(None, None)
+
+# amount_cents is a SQLite INTEGER (signed 64-bit); anything wider is unreadable
+MAX_CENTS = 2**63 - 1
+MIN_CENTS = -2**63
+
+_SYMBOLS = {"US$": "USD", "$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY"}
+_SYMBOL = re.compile("|".join(re.escape(s) for s in sorted(_SYMBOLS, key=len, reverse=True)))
+_CODE = re.compile(r"\b([A-Z]{3})\b")
+_MULTIPLIERS = {
+    "k": 1_000, "thousand": 1_000,
+    "m": 1_000_000, "mm": 1_000_000, "million": 1_000_000,
+    "b": 1_000_000_000, "bn": 1_000_000_000, "billion": 1_000_000_000,
+}
+_NUMBER = re.compile(
+    r"^(?P<sign>[-+])?(?P<number>\d[\d,]*(?:\.\d+)?|\.\d+)\s*(?P<unit>[a-z]+)?$", re.IGNORECASE
+)
+
+_EPOCH = datetime.date(1970, 1, 1)
+_DATE_FORMATS = (
+    "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y",
+    "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y",
+    "%d %B %Y", "%d %b %Y", "%Y%m%d",
+)
+_ISO_TIME = re.compile(r"^(\d{4}-\d{2}-\d{2})[T ]")
+
+
+def parse_amount(value):
+    """Read an amount into Amount(cents, currency); NO_AMOUNT if it isn't one."""
+    if value is None or isinstance(value, bool):
+        return NO_AMOUNT
+    if isinstance(value, (int, float)):
+        if value != value:  # NaN
+            return NO_AMOUNT
+        text, currency = str(value), None
+    else:
+        text = str(value).strip()
+        currency = None
+        m = _SYMBOL.search(text)
+        if m:
+            currency = _SYMBOLS[m.group()]
+            text = text[:m.start()] + text[m.end():]
+        m = _CODE.search(text)
+        if m:
+            currency = m.group(1)
+            text = text[:m.start()] + text[m.end():]
+        text = text.strip()
+
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1].strip()
+    m = _NUMBER.match(text.replace(" ", ""))
+    if not m:
+        return NO_AMOUNT
+    multiplier = 1
+    if m.group("unit"):
+        multiplier = _MULTIPLIERS.get(m.group("unit").lower())
+        if multiplier is None:
+            return NO_AMOUNT
+    try:
+        amount = Decimal(m.group("number").replace(",", "")) * multiplier
+        if negative or m.group("sign") == "-":
+            amount = -amount
+        # quantize raises past the context's 28 digits, so huge inputs land here too
+        cents = int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        return NO_AMOUNT
+    if not MIN_CENTS <= cents <= MAX_CENTS:
+        return NO_AMOUNT
+    return Amount(cents, currency)
+
+
+def parse_date(value):
+    """Read a date into seconds since the epoch (UTC midnight), or None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if not isinstance(value, datetime.date):
+        text = " ".join(str(value).split())
+        m = _ISO_TIME.match(text)
+        if m:
+            text = m.group(1)
+        for fmt in _DATE_FORMATS:
+            try:
+                value = datetime.datetime.strptime(text, fmt).date()
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    return (value - _EPOCH).days * 86400